@@ -0,0 +1,220 @@
+__author__ = 'Lab Hatter'
+
+import heapq
+from array import array
+from math import sqrt
+from PolygonUtils.PolygonUtils import getDistance
+from PolygonUtils.AdjacencyList import QUANTUM
+from TriangulationAStarR import TriangulationAStarR
+from utilities.indexedMinHeap import IndexedMinHeap
+
+
+def makeRegions(adjLst, regionSize):
+    """Groups the triangles into connected regions of up to regionSize triangles, growing each region breadth first
+    from the lowest numbered triangle that isn't in one yet. Returns the region of each triangle."""
+    regions = array('i', [-1]) * len(adjLst)
+    numRegions = 0
+    for seed in range(0, len(adjLst)):
+        if regions[seed] != -1:
+            continue
+        regions[seed] = numRegions
+        queue = [seed]
+        q = 0
+        while q < len(queue) and len(queue) < regionSize:
+            for nayb in adjLst[queue[q]].getNaybs():
+                if regions[nayb] == -1 and len(queue) < regionSize:
+                    regions[nayb] = numRegions
+                    queue.append(nayb)
+            q += 1
+        numRegions += 1
+    return regions
+
+
+class RegionGraph(object):
+    """An abstract graph over an AdjacencyList for agents of one radius. The triangles are grouped into regions,
+    and each pair of neighbouring regions gets one entrance on the widest edge between them. Entrances of the same
+    region are linked by the cost of walking between them inside the region. A query searches this small graph
+    first, then runs TriangulationAStarR only on the triangles of the regions the abstract path passes through."""
+    def __init__(self, aLst, radius=0, regionSize=64):
+        self.aLst = aLst
+        self.radius = radius
+        adjLst = aLst.adjLst
+        self.regions = makeRegions(adjLst, regionSize)
+        numRegions = max(self.regions) + 1 if len(adjLst) > 0 else 0
+        self.regionTris = [[] for r in range(0, numRegions)]
+        self.centerX = array('d')
+        self.centerY = array('d')
+        for el in adjLst:
+            self.regionTris[self.regions[el.selfInd]].append(el.selfInd)
+            self.centerX.append((el.tri[0].x + el.tri[1].x + el.tri[2].x) / 3.0)
+            self.centerY.append((el.tri[0].y + el.tri[1].y + el.tri[2].y) / 3.0)
+        # like makeReachability, an edge is passable if it's longer than the agent is wide
+        self.minLen = 2 * radius - QUANTUM
+
+        # find the widest passable edge between each pair of neighbouring regions
+        widest = dict()  # (region, region): (length, triangle, triangle on the other side, mid x, mid y)
+        for el in adjLst:
+            for nayb, p1, p2 in ((el.n12, 0, 1), (el.n23, 1, 2), (el.n13, 0, 2)):
+                if nayb is None or nayb < el.selfInd:
+                    continue
+                region1 = self.regions[el.selfInd]
+                region2 = self.regions[nayb]
+                if region1 == region2:
+                    continue
+                length = getDistance(el.tri[p1], el.tri[p2])
+                if length <= self.minLen:
+                    continue
+                key = (region1, region2) if region1 < region2 else (region2, region1)
+                if key not in widest or length > widest[key][0]:
+                    widest[key] = (length, el.selfInd, nayb,
+                                   (el.tri[p1].x + el.tri[p2].x) / 2.0, (el.tri[p1].y + el.tri[p2].y) / 2.0)
+
+        # entrance i sits on the middle of its edge, between triangles entranceTris[2*i] and entranceTris[2*i + 1]
+        self.entranceX = array('d')
+        self.entranceY = array('d')
+        self.entranceTris = array('i')
+        self.regionEntrances = [[] for r in range(0, numRegions)]
+        for key in sorted(widest):
+            length, tri1, tri2, midX, midY = widest[key]
+            ent = len(self.entranceX)
+            self.entranceX.append(midX)
+            self.entranceY.append(midY)
+            self.entranceTris.extend((tri1, tri2))
+            self.regionEntrances[key[0]].append(ent)
+            self.regionEntrances[key[1]].append(ent)
+
+        # link the entrances of each region by the cost of walking from one to the other inside the region
+        self.links = [[] for e in range(0, len(self.entranceX))]  # [(entrance, cost)]
+        for region in range(0, numRegions):
+            for ent in self.regionEntrances[region]:
+                costs = self.getEntranceCosts(region, self.getEntranceTri(ent, region))
+                for other, cost in costs:
+                    if other != ent:
+                        self.links[ent].append((other, cost + self.getEntranceOffset(ent, region)))
+
+    def getEntranceTri(self, ent, region):
+        """Returns the triangle on the region's side of the entrance."""
+        tri = self.entranceTris[2 * ent]
+        if self.regions[tri] != region:
+            tri = self.entranceTris[2 * ent + 1]
+        return tri
+
+    def getEntranceOffset(self, ent, region):
+        """Returns the distance from the entrance to the center of the triangle on the region's side of it."""
+        tri = self.getEntranceTri(ent, region)
+        dX = self.entranceX[ent] - self.centerX[tri]
+        dY = self.entranceY[ent] - self.centerY[tri]
+        return sqrt(dX * dX + dY * dY)
+
+    def getRegionDistances(self, source):
+        """Returns {triangle: distance} for the triangles reachable from source without leaving its region,
+        walking between triangle centers across passable edges."""
+        adjLst = self.aLst.adjLst
+        region = self.regions[source]
+        dists = {source: 0.0}
+        heap = [(0.0, source)]
+        while heap:
+            dist, ind = heapq.heappop(heap)
+            if dist > dists[ind]:
+                continue  # stale entry
+            el = adjLst[ind]
+            for nayb, p1, p2 in ((el.n12, 0, 1), (el.n23, 1, 2), (el.n13, 0, 2)):
+                if nayb is None or self.regions[nayb] != region or getDistance(el.tri[p1], el.tri[p2]) <= self.minLen:
+                    continue
+                dX = self.centerX[nayb] - self.centerX[ind]
+                dY = self.centerY[nayb] - self.centerY[ind]
+                naybDist = dist + sqrt(dX * dX + dY * dY)
+                if naybDist < dists.get(nayb, float('inf')):
+                    dists[nayb] = naybDist
+                    heapq.heappush(heap, (naybDist, nayb))
+        return dists
+
+    def getEntranceCosts(self, region, source):
+        """Returns [(entrance, cost)] from the center of the triangle source to each entrance of the region it can
+        reach without leaving the region."""
+        dists = self.getRegionDistances(source)
+        costs = []
+        for ent in self.regionEntrances[region]:
+            tri = self.getEntranceTri(ent, region)
+            if tri in dists:
+                costs.append((ent, dists[tri] + self.getEntranceOffset(ent, region)))
+        return costs
+
+    def findCorridor(self, startTri, goalTri, startPt, goalPt):
+        """Searches the abstract graph from startTri to goalTri. Returns a bytearray flagging the triangles of every
+        region the abstract path passes through, or None if the goal can't be reached."""
+        numEnts = len(self.entranceX)
+        goalNode = numEnts
+        startRegion = self.regions[startTri]
+        goalRegion = self.regions[goalTri]
+
+        def getH(ent):
+            dX = goalPt.x - self.entranceX[ent]
+            dY = goalPt.y - self.entranceY[ent]
+            return sqrt(dX * dX + dY * dY)
+
+        # the cost from each of the goal region's entrances to the goal
+        goalCosts = dict(self.getEntranceCosts(goalRegion, goalTri))
+        g = [float('inf')] * (numEnts + 1)
+        par = [-1] * (numEnts + 1)
+        openEnts = IndexedMinHeap(numEnts + 1)
+        closed = bytearray(numEnts + 1)
+        for ent, cost in self.getEntranceCosts(startRegion, startTri):
+            g[ent] = cost
+            openEnts.push(ent, cost + getH(ent))
+        if startRegion == goalRegion:
+            dists = self.getRegionDistances(startTri)
+            if goalTri in dists:
+                g[goalNode] = dists[goalTri]
+                openEnts.push(goalNode, g[goalNode])
+
+        while openEnts:
+            ent = openEnts.pop()[1]
+            if ent == goalNode:
+                break
+            closed[ent] = 1
+            links = self.links[ent]
+            if ent in goalCosts:
+                links = links + [(goalNode, goalCosts[ent])]
+            for other, cost in links:
+                if closed[other] or g[ent] + cost >= g[other]:
+                    continue
+                g[other] = g[ent] + cost
+                par[other] = ent
+                openEnts.push(other, g[other] + (getH(other) if other != goalNode else 0.0))
+        else:
+            return None
+
+        corridorRegions = set((startRegion, goalRegion))
+        ent = par[goalNode]
+        while ent != -1:
+            corridorRegions.add(self.regions[self.entranceTris[2 * ent]])
+            corridorRegions.add(self.regions[self.entranceTris[2 * ent + 1]])
+            ent = par[ent]
+        corridor = bytearray(len(self.regions))
+        for region in corridorRegions:
+            for tri in self.regionTris[region]:
+                corridor[tri] = 1
+        return corridor
+
+    def findPath(self, startPt, goalPt):
+        """Returns the path from startPt to goalPt for this graph's radius, or an empty path if there isn't one."""
+        locator = self.aLst.getPointLocator()
+        startTri = locator.locate(startPt)
+        goalTri = locator.locate(goalPt)
+        if startTri is None or goalTri is None:
+            raise ValueError("start point or goal point is not on the mesh")
+
+        corridor = self.findCorridor(startTri, goalTri, startPt, goalPt)
+        if corridor is None:
+            return []
+        # building the width table is O(n^2) in triangles, so without one the search works out only the widths of
+        # the corridor triangles it reaches
+        widths = self.aLst.getWidthTable() if self.aLst.hasWidthTable() else None
+        path = TriangulationAStarR(self.aLst.adjLst, startPt, goalPt, radius=self.radius, locator=locator,
+                                   widths=widths, corridor=corridor).AStar()
+        if not path:
+            # the corridor was picked by the coarse costs alone, so search the whole mesh before giving up
+            path = TriangulationAStarR(self.aLst.adjLst, startPt, goalPt, radius=self.radius, locator=locator,
+                                       widths=widths, components=self.aLst.getReachability(self.radius)).AStar()
+        return path
@@ -53,7 +53,11 @@ class Pathfinding(ShowBase): #BareBonesEditor):
         wireNP.setRenderMode(RenderModeAttrib.MWireframe, .5, 0)
         mapNP.instanceTo(wireNP)
 
-        aStar = TriangulationAStarR(aLst.adjLst, Point3(0.0, -5.0, 0.0), Point3(0.0, 5.5, 0.0), radius=0.0)
+        aStar = TriangulationAStarR(aLst.adjLst, Point3(0.0, -5.0, 0.0), Point3(0.0, 5.5, 0.0), radius=0.0,
+                                    locator=aLst.getPointLocator(),
+                                    # no width table: building it is O(n^2) in triangles, so this one query
+                                    # works out only the widths it reaches
+                                    components=aLst.getReachability(0.0))
         # aStar = TriangulationAStarR(aLst.adjLst, Point3(aLst.adjLst[17].getCenter() + Point3(5, 0, 0)), Point3(0, 11, 0), radius=.55)
         # aStar = TriangulationAStarR(aLst.adjLst, Point3(-5, 4, 0), Point3(aLst.adjLst[17].getCenter() + Point3(5, 0, 0)), radius=.55)
         path = aStar.AStar()
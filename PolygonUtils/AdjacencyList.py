@@ -4,47 +4,212 @@ __author__ = 'Lab Hatter'
 from panda3d.core import Point2D, Point3, Vec4, Vec3
 from panda3d.core import GeomVertexFormat, GeomVertexData, GeomLines, Triangulator
 from panda3d.core import Geom, GeomNode, GeomTriangles, GeomVertexWriter, ModelNode, NodePath
+from panda3d.core import Thread, LineSegs
 from math import sqrt, pow
-from PolygonUtils import getDistance, isPointInWedge
-from Triangle import Triangle, getSharedEdgeStr
+from array import array
+from PolygonUtils import getDistance, isPointInWedge, getDistToLine, getNearestPointOnLine
+from Triangle import Triangle, TrianglePoints, getSharedEdgeStr
+from PointLocator import PointLocator
+from direct.directnotify.DirectNotify import DirectNotify
 
+notify = DirectNotify().newCategory("AdjacencyList")
 
-def copyAdjLstElement(adjLstEl):
-    cpy = AdjLstElement(adjLstEl.tri, adjLstEl.selfInd, adjLstEl.n12, adjLstEl.n23, adjLstEl.n13)
-    cpy.par = adjLstEl.par
-    cpy.g = adjLstEl.g
-    cpy.f = adjLstEl.f
-    return cpy
+
+QUANTUM = 1.0e-4  # spacing of the grid vertices are snapped to, so nearly equal points hash the same
+
+
+def getVertexKey(pt):
+    """Snaps the point to the quantization grid and returns it as a hashable tuple."""
+    return int(round(pt.x / QUANTUM)), int(round(pt.y / QUANTUM)), int(round(pt.z / QUANTUM))
+
+
+def getEdgeKey(pt1, pt2):
+    """Returns a key for the edge between the two points that's the same regardless of the points' order."""
+    key1 = getVertexKey(pt1)
+    key2 = getVertexKey(pt2)
+    if key1 < key2:
+        return key1, key2
+    return key2, key1
 
 
-class AdjLstElement(Triangle):
+def copyAdjLstElement(adjLstEl):
+    return AdjLstElement(adjLstEl.tri, adjLstEl.selfInd, adjLstEl.n12, adjLstEl.n23, adjLstEl.n13)
+
+
+class TriangleArrays(object):
+    """
+    The triangles of a mesh stored as flat arrays rather than as an object each. Per triangle there are
+    9 floats of coords (pt1, pt2 & pt3 in the order given), the int neighbours across edges 12, 23 & 13 (-1 for none)
+    and a flag for whether tri, the points counterclockwise, swaps pt2 and pt3. widths is the width table of
+    makeWidthTable once there is one. AdjLstElement views these, one triangle at a time.
+    """
+    __slots__ = ('coords', 'naybs', 'flipped', 'widths')
+
+    def __init__(self):
+        self.coords = array('f')
+        self.naybs = array('i')
+        self.flipped = bytearray()
+        self.widths = None
+
+    def addTriangle(self, pt1, pt2, pt3, n12=None, n23=None, n13=None):
+        """Adds a triangle from three indexable x, y, z points, and returns its index."""
+        self.coords.extend((pt1[0], pt1[1], pt1[2], pt2[0], pt2[1], pt2[2], pt3[0], pt3[1], pt3[2]))
+        self.naybs.extend((-1 if n12 is None else n12, -1 if n23 is None else n23, -1 if n13 is None else n13))
+        self.flipped.append(self.isClockwise(pt1, pt2, pt3))
+        return len(self.flipped) - 1
+
+    def setTriangle(self, ind, pt1, pt2, pt3):
+        """Moves the triangle at ind onto three new points. Its neighbours are left as they were."""
+        base = 9 * ind
+        self.coords[base:base + 9] = array('f', (pt1[0], pt1[1], pt1[2], pt2[0], pt2[1], pt2[2],
+                                                 pt3[0], pt3[1], pt3[2]))
+        self.flipped[ind] = self.isClockwise(pt1, pt2, pt3)
+
+    @staticmethod
+    def isClockwise(pt1, pt2, pt3):
+        """Returns 1 if the points turn clockwise, which Triangle.setTri lists as 1, 3, 2 in tri, else 0."""
+        cross = (pt2[0] - pt1[0]) * (pt3[1] - pt1[1]) - (pt2[1] - pt1[1]) * (pt3[0] - pt1[0])
+        return 1 if cross < 0 else 0
+
+    def getPoint(self, ind, i):
+        """Returns point i, 0, 1 or 2 in the order given, of the triangle at ind."""
+        base = 9 * ind + 3 * i
+        return Point3(self.coords[base], self.coords[base + 1], self.coords[base + 2])
+
+    def getNayb(self, ind, edge):
+        """Returns the neighbour across edge 0 (12), 1 (23) or 2 (13) of the triangle at ind, or None."""
+        nayb = self.naybs[3 * ind + edge]
+        if nayb == -1:
+            return None
+        return nayb
+
+    def setNayb(self, ind, edge, nayb):
+        self.naybs[3 * ind + edge] = -1 if nayb is None else nayb
+
+    def __len__(self):
+        return len(self.flipped)
+
+
+class AdjLstElementList(object):
+    """A read-only sequence of AdjLstElement views of a TriangleArrays. Views are made as they're asked for, so
+    the only per triangle storage is in the arrays."""
+    __slots__ = ('arrays',)
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+
+    def __getitem__(self, ind):
+        if isinstance(ind, slice):
+            return [self[i] for i in range(*ind.indices(len(self)))]
+        if ind < 0:
+            ind += len(self.arrays)
+        if not 0 <= ind < len(self.arrays):
+            raise IndexError("AdjLstElementList index out of range")
+        return AdjLstElement.makeView(self.arrays, ind)
+
+    def __iter__(self):
+        arrays = self.arrays
+        for i in range(0, len(arrays)):
+            yield AdjLstElement.makeView(arrays, i)
+
+    def __len__(self):
+        return len(self.arrays)
+
+
+class AdjLstElement(TrianglePoints):
+    """
+    One triangle of an AdjacencyList, along with the indices of its neighbours. It's a view of a row of a
+    TriangleArrays, which the element's attributes read and write. An element made directly from points gets
+    arrays of its own.
+    """
+    __slots__ = ('_arrays', '_row', 'selfInd')
+
+    @classmethod
+    def makeView(cls, arrays, ind):
+        """Returns the element for the triangle at ind of the arrays."""
+        el = cls.__new__(cls)
+        el._arrays = arrays
+        el._row = ind
+        el.selfInd = ind
+        return el
+
     def __init__(self, triOrPts, slfInd, n12Ind=None, n23Ind=None, n13Ind=None):
         """If points are past they must be in a tuple-like object"""
         if isinstance(triOrPts, Triangle):
-            Triangle.__init__(self, triOrPts.pt1, triOrPts.pt2, triOrPts.pt3)
+            pts = (triOrPts.pt1, triOrPts.pt2, triOrPts.pt3)
         else:
-            Triangle.__init__(self, triOrPts[0], triOrPts[1], triOrPts[2])
-
+            pts = (triOrPts[0], triOrPts[1], triOrPts[2])
+        self._arrays = TriangleArrays()
+        self._row = self._arrays.addTriangle(pts[0], pts[1], pts[2], n12Ind, n23Ind, n13Ind)
         self.selfInd = slfInd
-        self.n12 = n12Ind  # neighbour on 12's edge
-        self.w2313 = -1  # width when crossing edges 23 & 13
-        self.n23 = n23Ind
-        self.w1213 = -1
-        self.n13 = n13Ind
-        self.w1223 = -1
-        self.par = None
-        self.g = 100000
-        self.f = 100000
+
+    def setTri(self, pt1, pt2, pt3):
+        self._arrays.setTriangle(self._row, pt1, pt2, pt3)
+
+    @property
+    def pt1(self):
+        return self._arrays.getPoint(self._row, 0)
+
+    @property
+    def pt2(self):
+        return self._arrays.getPoint(self._row, 1)
+
+    @property
+    def pt3(self):
+        return self._arrays.getPoint(self._row, 2)
+
+    @property
+    def tri(self):
+        arrays = self._arrays
+        row = self._row
+        if arrays.flipped[row]:
+            return [arrays.getPoint(row, 0), arrays.getPoint(row, 2), arrays.getPoint(row, 1)]
+        return [arrays.getPoint(row, 0), arrays.getPoint(row, 1), arrays.getPoint(row, 2)]
+
+    @property
+    def n12(self):  # neighbour on 12's edge
+        return self._arrays.getNayb(self._row, 0)
+
+    @n12.setter
+    def n12(self, value):
+        self._arrays.setNayb(self._row, 0, value)
+
+    @property
+    def n23(self):
+        return self._arrays.getNayb(self._row, 1)
+
+    @n23.setter
+    def n23(self, value):
+        self._arrays.setNayb(self._row, 1, value)
+
+    @property
+    def n13(self):
+        return self._arrays.getNayb(self._row, 2)
+
+    @n13.setter
+    def n13(self, value):
+        self._arrays.setNayb(self._row, 2, value)
+
+    def _getWidth(self, i):
+        if self._arrays.widths is None:
+            return -1
+        return self._arrays.widths[3 * self._row + i]
+
+    @property
+    def w2313(self):  # width when crossing edges 23 & 13
+        return self._getWidth(0)
+
+    @property
+    def w1213(self):
+        return self._getWidth(1)
+
+    @property
+    def w1223(self):
+        return self._getWidth(2)
 
     def getNaybs(self):
-        n = []
-        if self.n12 is not None:
-            n.append(self.n12)
-        if self.n23 is not None:
-            n.append(self.n23)
-        if self.n13 is not None:
-            n.append(self.n13)
-        return n
+        base = 3 * self._row
+        return [nayb for nayb in self._arrays.naybs[base:base + 3] if nayb != -1]
 
     def getDistanceToCentersOrPoint(self, other):
         if isinstance(other, tuple((AdjLstElement, Triangle))):
@@ -108,46 +273,73 @@ class AdjLstElement(Triangle):
              " >   < slf: " + str(self.selfInd) +\
             " n12: " + str(self.n12) +\
             " n23: " + str(self.n23) +\
-            " n13: " + str(self.n13) +\
-            " >   < par: " + str(self.par) #+\
-            # ", g: " + str(self.g) +\
-            # ", f: " + str(self.f) + " >"
+            " n13: " + str(self.n13) + " >"
 
         return sr
 
 
 class AdjacencyList(object):
     def __init__(self, triangles):
-        triLst = []
-        self.adjLst = [] # triangles
-        if isinstance(triangles, Triangulator):
+        if isinstance(triangles, TriangleArrays):
+            # already linked, e.g. loaded by NavMeshFile, so the arrays are used as they are
+            self.arrays = triangles
+        else:
+            self.arrays = TriangleArrays()
+        self.adjLst = AdjLstElementList(self.arrays)  # triangles, as views of the arrays
+        self._locator = None
+        self._reachability = dict()  # radius: component of each triangle
+        arrays = self.arrays
+        if isinstance(triangles, TriangleArrays):
+            return
+        elif isinstance(triangles, Triangulator):
             # get the full list of triangles because we can't search a partial list
             for i in range(0, triangles.getNumTriangles()):
                 v0 = triangles.getVertex(triangles.getTriangleV0(i))
                 v1 = triangles.getVertex(triangles.getTriangleV1(i))
                 v2 = triangles.getVertex(triangles.getTriangleV2(i))
-                self.adjLst.append(AdjLstElement(Triangle(Point3(v0.x, v0.y, 0),
-                                                      Point3(v1.x, v1.y, 0),
-                                                      Point3(v2.x, v2.y, 0)), i))
+                arrays.addTriangle((v0.x, v0.y, 0), (v1.x, v1.y, 0), (v2.x, v2.y, 0))
         elif isinstance(triangles, AdjacencyList):
-            for i in range(0, len(triangles.adjLst)):
-                self.adjLst.append(AdjLstElement(triangles.adjLst[i].tri, i))
+            for el in triangles.adjLst:
+                arrays.addTriangle(*el.tri)
+        elif hasattr(triangles, 'getTriangleVertices'):
+            # a computationalgeom.cornerTable.CornerTable with coords. It already knows the neighbours,
+            # and its edges 0, 1 & 2 are our 12, 23 & 13 edges.
+            for i in range(0, len(triangles)):
+                pts = [triangles.getVertexCoords(v) for v in triangles.getTriangleVertices(i)]
+                n12, n23, n13 = triangles.getNeighbors(i)
+                arrays.addTriangle(pts[0], pts[1], pts[2], n12, n23, n13)
+            return
         else:  # should be a list or a Triangulator
             for i in range(0, len(triangles)):
-                self.adjLst.append(AdjLstElement(triangles[i].tri, i))
+                arrays.addTriangle(*triangles[i].tri)
 
         # adjLst in the form [(triangle, n12, n23, n13)] i.e. n12 is the triInd across verts 1 & 2
-        # find the neighbours
-        for j in range(0, len(self.adjLst)):
-            for k in range(0, len(self.adjLst)):
-                if j != k:
-                    nayb = getSharedEdgeStr(self.adjLst[j], self.adjLst[k])
-                    if nayb == '12':
-                        self.adjLst[j].n12 = k
-                    if nayb == '23':
-                        self.adjLst[j].n23 = k
-                    if nayb == '13':
-                        self.adjLst[j].n13 = k
+        self.linkNeighbors()
+
+    def linkNeighbors(self):
+        """Finds the neighbours of every triangle in one pass by indexing each triangle's edges by their end points."""
+        # an edge is first seen from one side and waits in openEdges, until the triangle on the other side claims it
+        openEdges = dict()
+        for el in self.adjLst:
+            pts = el.getPoints()
+            for nayb, p1, p2 in (('n12', 0, 1), ('n23', 1, 2), ('n13', 0, 2)):
+                key = getEdgeKey(pts[p1], pts[p2])
+                other = openEdges.pop(key, None)
+                if other is None:
+                    openEdges[key] = (el.selfInd, nayb)
+                else:
+                    setattr(el, nayb, other[0])
+                    setattr(self.adjLst[other[0]], other[1], el.selfInd)
+
+    def getPointLocator(self):
+        """Returns the grid used to find the triangle under a point, building it the first time it's asked for."""
+        if self._locator is None:
+            self._locator = PointLocator(self.adjLst)
+        return self._locator
+
+    def setPointLocator(self, locator):
+        """Uses locator, which must be over this list's triangles, instead of building one."""
+        self._locator = locator
 
     def at(self, ind):
         return self.adjLst[ind]
@@ -155,9 +347,337 @@ class AdjacencyList(object):
     def getNaybsAt(self, ind):
         return self.adjLst[ind].getNaybs()
 
+    def getWidthTable(self):
+        """Returns the path widths of every triangle (see makeWidthTable), computing them the first time they're asked for.
+        That takes O(n^2) time in the number of triangles, so it's for meshes that are searched many times, ideally
+        built ahead of time and saved with NavMeshFile. A single search is better off without the table."""
+        if self.arrays.widths is None:
+            self.arrays.widths = makeWidthTable(self.adjLst)
+        return self.arrays.widths
+
+    def hasWidthTable(self):
+        """Returns whether the width table has been computed, set or loaded, so getWidthTable won't have to build it."""
+        return self.arrays.widths is not None
+
+    def setWidthTable(self, widths):
+        """Uses widths, in the layout of makeWidthTable, instead of computing them. For meshes like a Local Clearance
+        Triangulation whose widths are already known."""
+        if len(widths) != 3 * len(self.adjLst):
+            raise ValueError("expected 3 widths per triangle, got {0} for {1} triangles".format(len(widths),
+                                                                                              len(self.adjLst)))
+        self.arrays.widths = widths
+
+    def getReachability(self, radius):
+        """Returns the component of each triangle for agents of the given radius (see makeReachability),
+        computing them the first time the radius is asked for."""
+        if radius not in self._reachability:
+            self._reachability[radius] = makeReachability(self.adjLst, radius)
+        return self._reachability[radius]
+
+
+def getWidthAcrossEdges(adjLst, searchTri, edge1, edge2):
+    """Calculates the path width through the triangle searchTri of adjLst. Edge1 and edge2 are the edges being crossed."""
+    # this calculates the distance from the point shared by edge1 and edge2 to the nearest obstacle
+    # 1st it sets the width of the triangle to the shortest edge being crossed
+    # then it searches across the third edge to see if there is an obstacle closer than its own vertices
+    # yes that can happen!!!
+    for p in edge1:
+        if p in edge2:
+            pt = p  # get the point that both edges share. This is the point we are measuring the distance to.
+
+    if edge2 == searchTri.getEdge12() and searchTri.n12 is None\
+        or edge2 == searchTri.getEdge23() and searchTri.n23 is None\
+        or edge2 == searchTri.getEdge13() and searchTri.n13 is None:
+        # if edge2 is on a constrained side swap it for edge1
+        # doint this makes it so we only have to check edge1. It cuts our code for the next step in half.
+        tmp = edge2
+        edge2 = edge1
+        edge1 = tmp
+
+    # TODO make this work with edge 1, 2, & 3 and local vars nayb 1, 2, & 3 so it's not sooo much code
+    if edge1 == searchTri.getEdge12() and searchTri.n12 is None:
+        if edge2 == searchTri.getEdge23() and searchTri.n23 is None:
+            # Both search edges are constrained, so the width of the triangle is the width of the third edge.
+            return getDistance(searchTri.getPoint1(), searchTri.getPoint3())
+
+        elif edge2 == searchTri.getEdge13() and searchTri.n13 is None:
+            # ditto
+            return getDistance(searchTri.getPoint2(), searchTri.getPoint3())
+        else:
+            # the other edge is not constrained, so the initial width
+            # should be the shortest of either the length of this unconstrained edge
+            # or the distance from its non-shared point to the constrained side
+            if edge2 == searchTri.getEdge23():
+                minWidth = getDistance(searchTri.getPoint2(), searchTri.getPoint3())
+                # we also need to find the end point for the next step
+                if pt != edge2[0]:
+                    otherPt = edge2[0]
+                else:
+                    otherPt = edge2[1]
+            else:  # the other (non-constrained) edge is 13
+                minWidth = getDistance(searchTri.getPoint1(), searchTri.getPoint3())
+                # we also need to find the end point for the next step
+                if pt != edge2[0]:
+                    otherPt = edge2[0]
+                else:
+                    otherPt = edge2[1]
+            # so now get the distance from the end to the other (constrained) edge
+            debugEdgeConstrained = edge1  ############################# DEBUG
+            distAcrossTri = getDistance(getNearestPointOnLine(otherPt, edge1),
+                                        otherPt)
+            if distAcrossTri < minWidth:
+                minWidth = distAcrossTri
+            # ########################### this next bit seems off
+            else:
+                minWidth = getDistance(searchTri.getPoint1(), searchTri.getPoint3())
+    elif edge1 == searchTri.getEdge13() and searchTri.n13 is None:
+
+        if edge2 == searchTri.getEdge23() and searchTri.n23 is None:
+            # both are constrained, so the width of the triangle is the length of the unconstrained edge
+            return getDistance(searchTri.getPoint1(), searchTri.getPoint2())
+
+        elif edge2 == searchTri.getEdge12() and searchTri.n12 is None:
+            return getDistance(searchTri.getPoint2(), searchTri.getPoint3())
+        else:
+            # the other edge is not constrained, so the initial width
+            # should be either the length of this unconstrained edge
+            # or the distance from its non-shared point to the constrained side, whichever is shortest
+            if edge2 == searchTri.getEdge23():
+                minWidth = getDistance(searchTri.getPoint2(), searchTri.getPoint3())
+                # we also need to find the end point for the next step
+                if pt != edge2[0]:
+                    otherPt = edge2[0]
+                else:
+                    otherPt = edge2[1]
+            else:  # the other (non-constrained) edge is 12
+                minWidth = getDistance(searchTri.getPoint1(), searchTri.getPoint2())
+                # we also need to find the end point for the next step
+                if pt != edge2[0]:
+                    otherPt = edge2[0]
+                else:
+                    otherPt = edge2[1]
+            # so now get the distance from the end to the other (constrained) edge
+            debugEdgeConstrained = edge1  ############################# DEBUG
+            distAcrossTri = getDistance(getNearestPointOnLine(otherPt, edge1),
+                                        otherPt)
+            if distAcrossTri < minWidth:
+                minWidth = distAcrossTri
+            # ########################### this next bit seems off
+            else:
+                minWidth = getDistance(searchTri.getPoint1(), searchTri.getPoint3())
+
+    elif edge1 == searchTri.getEdge23() and searchTri.n23 is None:
 
+        if edge2 == searchTri.getEdge13() and searchTri.n13 is None:
+            # both are constrained, so the width of the triangle is the length of the unconstrained edge
+            return getDistance(searchTri.getPoint1(), searchTri.getPoint2())
 
-def makeTriMesh( verts, holeVerts=[[]]):
+        elif edge2 == searchTri.getEdge12() and searchTri.n12 is None:
+            return getDistance(searchTri.getPoint1(), searchTri.getPoint2())
+        else:
+            # the other edge is not constrained, so the initial width
+            # should be either the length of this unconstrained edge
+            # or the distance from its non-shared point to the constrained side, whichever is shortest
+            if edge2 == searchTri.getEdge12():
+                minWidth = getDistance(searchTri.getPoint1(), searchTri.getPoint2())
+                # we also need to find the end point for the next step
+                if pt != edge2[0]:
+                    otherPt = edge2[0]
+                else:
+                    otherPt = edge2[1]
+            else:  # the other (non-constrained) edge is 13
+                minWidth = getDistance(searchTri.getPoint1(), searchTri.getPoint3())
+                # we also need to find the end point for the next step
+                if pt != edge2[0]:
+                    otherPt = edge2[0]
+                else:
+                    otherPt = edge2[1]
+            # so now get the distance from the end to the other (constrained) edge
+            debugEdgeConstrained = edge1  ############################# DEBUG
+            distAcrossTri = getDistance(getNearestPointOnLine(otherPt, edge1),
+                                        otherPt)
+            if distAcrossTri < minWidth:
+                minWidth = distAcrossTri
+            # ########################### this next bit seems off
+            else:
+                minWidth = getDistance(searchTri.getPoint1(), searchTri.getPoint3())
+    else:  # edge1 and edge2 are not constrained
+        # Get the width of the shortest of the these two edges
+        minWidth = min((edge1[0] - edge1[1]).length(), (edge2[0] - edge2[1]).length())
+
+    # if minWidth < 1:
+    #     print "minWidth < 1 pt = ", pt, " || otherPt = ", otherPt, "  || debugConstrained = ", debugEdgeConstrained
+
+    # save these so we don't consider them as nearest points later, else every triangle's width will be 0
+    edgePts = [edge1[0], edge1[1]]
+    edgePts.extend([edge2[0], edge2[1]])
+
+    # FINALLY search across the third edge for a constrained edge
+    # that's closer (to the shared point) than this triangle's vertices
+    # print adjLst
+    # ###################################################
+    counter = 0
+    debug = notify.getDebug()
+    # ###################################################
+    for t in range(0, len(adjLst)):
+        # if the edge is constrained, check to see if it narrows the width of this path
+        tri = adjLst[t]
+        # print tri
+        if tri.selfInd != searchTri.selfInd:
+            if tri.n12 is None:
+                # if the constrained edge, is on the opposite side
+                # from the point shared between the shared edges i.e. for point C check across edge c
+                nearest = getNearestPointOnLine(pt, [tri.tri[0], tri.tri[1]], True)
+                # print tri.selfInd, " 12 is none nearest", nearest
+                if isPointInWedge(nearest, edge1, edge2) and nearest not in edgePts:
+                    # and it's in the wedge, check the distance against the current minimum width
+                    newW = getDistance(pt, nearest)
+                    # print "in wedge newW", newW
+                    if newW < minWidth:
+                        # ####################################################
+                        if debug:
+                            # draw the obstacle that narrows the width
+                            counter += 1
+                            linesegs2 = LineSegs("lines" + str(counter))
+                            linesegs2.setColor(0, 1, 1, 1)
+                            linesegs2.setThickness(5)
+                            linesegs2.drawTo(pt)
+                            linesegs2.drawTo(nearest)
+                            node2 = linesegs2.create(False)
+                            nodePath = render.attachNewNode(node2)
+                            nodePath.setZ(.25)
+                        # ####################################################
+                        minWidth = newW
+            # do likewise for the other edges
+            if tri.n23 is None:
+                nearest = getNearestPointOnLine(pt, [tri.tri[1], tri.tri[2]], True)
+                # print tri.selfInd, " 23  is none nearest", nearest
+                if isPointInWedge(nearest, edge1, edge2) and nearest not in edgePts:
+                    newW = getDistance(pt, nearest)
+                    # print "in wedge newW", newW
+                    if newW < minWidth:
+                        # ####################################################
+                        if debug:
+                            # draw the obstacle that narrows the width
+                            counter += 1
+                            linesegs2 = LineSegs("lines" + str(counter))
+                            linesegs2.setColor(0, 1, 1, 1)
+                            linesegs2.setThickness(5)
+                            linesegs2.drawTo(pt)
+                            linesegs2.drawTo(nearest)
+                            node2 = linesegs2.create(False)
+                            nodePath = render.attachNewNode(node2)
+                            nodePath.setZ(.25)
+                        # ####################################################
+                        minWidth = newW
+
+            if tri.n13 is None:
+                nearest = getNearestPointOnLine(pt, [tri.tri[0], tri.tri[2]], True)
+                # print tri.selfInd, " 13 is none nearest", nearest
+                if isPointInWedge(nearest, edge1, edge2) and nearest not in edgePts:
+                    newW = getDistance(pt, nearest)
+                    # print "in wedge newW", newW
+                    if newW < minWidth:
+                        # ####################################################
+                        if debug:
+                            # draw the obstacle that narrows the width
+                            counter += 1
+                            linesegs2 = LineSegs("lines" + str(counter))
+                            linesegs2.setColor(0, 1, 1, 1)
+                            linesegs2.setThickness(5)
+                            linesegs2.drawTo(pt)
+                            linesegs2.drawTo(nearest)
+                            node2 = linesegs2.create(False)
+                            nodePath = render.attachNewNode(node2)
+                            nodePath.setZ(.25)
+                        # ####################################################
+                        minWidth = newW
+
+
+
+
+    return minWidth
+
+
+def getTriangleWidths(adjLst, tri):
+    """Returns the widths of the path through the triangle as (w2313, w1213, w1223),
+    i.e. when crossing edges 23 & 13, 12 & 13 and 12 & 23. None is more than the lengths of the edges it crosses."""
+    if tri.n12 is None:
+        w2313 = getDistToLine(tri.tri[2], tri.tri[0], tri.tri[1])
+    else:
+        w2313 = getWidthAcrossEdges(adjLst, tri, [tri.tri[1], tri.tri[2]], [tri.tri[0], tri.tri[2]])
+    if tri.n23 is None:
+        w1213 = getDistToLine(tri.tri[0], tri.tri[1], tri.tri[2])
+    else:
+        w1213 = getWidthAcrossEdges(adjLst, tri, [tri.tri[0], tri.tri[1]], [tri.tri[0], tri.tri[2]])
+    if tri.n13 is None:
+        w1223 = getDistToLine(tri.tri[1], tri.tri[0], tri.tri[2])
+    else:
+        w1223 = getWidthAcrossEdges(adjLst, tri, [tri.tri[0], tri.tri[1]], [tri.tri[1], tri.tri[2]])
+    # the edges end at obstacles, so a path is never wider than the edges it crosses. getWidthAcrossEdges can
+    # come out wider than that, and makeReachability depends on it not doing so
+    l12 = getDistance(tri.tri[0], tri.tri[1])
+    l23 = getDistance(tri.tri[1], tri.tri[2])
+    l13 = getDistance(tri.tri[0], tri.tri[2])
+    return min(w2313, l23, l13), min(w1213, l12, l13), min(w1223, l12, l23)
+
+
+def makeWidthTable(adjLst):
+    """Returns the widths of every triangle in a flat array, three per triangle in the order w2313, w1213, w1223.
+    The widths only depend on the mesh, so the table can be shared by every search on it. Each width can search
+    the whole mesh (see getWidthAcrossEdges), so building the table is O(n^2) in the number of triangles."""
+    widths = array('f')
+    for tri in adjLst:
+        widths.extend(getTriangleWidths(adjLst, tri))
+    return widths
+
+
+def makeReachability(adjLst, radius):
+    """Labels each triangle with a component, such that an agent of the given radius can't get between triangles
+    with different labels. Triangles are joined across every edge that is longer than the agent is wide.
+    A search only crosses an edge out of the start triangle if it's longer than the agent is wide, and through any
+    other triangle if its width there is (see TriangulationAStarR.getWidthThrough). Those widths are never more than
+    the lengths of the edges crossed (see getTriangleWidths), so this may join triangles a search won't, but never
+    the reverse. Width tables from elsewhere, like setWidthTable's, must keep to that too."""
+    parents = array('i', range(0, len(adjLst)))
+
+    def find(ind):
+        root = ind
+        while parents[root] != root:
+            root = parents[root]
+        while parents[ind] != root:  # point the whole chain straight at the root
+            parents[ind], ind = root, parents[ind]
+        return root
+
+    # the edge length is padded so rounding in the width checks can't make an edge the search uses look too narrow
+    minLen = 2 * radius - QUANTUM
+    for el in adjLst:
+        for nayb, p1, p2 in ((el.n12, 0, 1), (el.n23, 1, 2), (el.n13, 0, 2)):
+            if nayb is None or nayb < el.selfInd:  # no neighbour, or this edge was seen from the other side
+                continue
+            if getDistance(el.tri[p1], el.tri[p2]) > minLen:
+                root1 = find(el.selfInd)
+                root2 = find(nayb)
+                if root1 != root2:
+                    parents[max(root1, root2)] = min(root1, root2)
+
+    return array('i', [find(i) for i in range(0, len(adjLst))])
+
+
+INDEX_TYPECODES = {1: 'B', 2: 'H', 4: 'I'}  # the array typecode for each width of index, in bytes
+
+
+def setPrimitiveIndices(prim, indices):
+    """Replaces the primitive's vertex indices with the given flat list of indices in a single write."""
+    prim.setIndexType(Geom.NTUint32)
+    indexArry = prim.modifyVertices()
+    indexArry = indexArry.modifyHandle(Thread.getCurrentThread())  # releases the array when deleted
+    indexArry.setData(array(INDEX_TYPECODES[prim.getIndexStride()], indices).tostring())
+
+
+def makeTriMesh( verts, holeVerts=[[]], bulkIndices=False):
+    """Triangulates the polygon and its holes. If bulkIndices is True, the triangles' vertex indices are
+    copied into the GeomTriangles at once rather than through one addVertices() call per triangle."""
     pointmap = (lambda x, y: (x, y, 0))
     if not holeVerts:
         holeVerts = [[]]
@@ -184,10 +704,12 @@ def makeTriMesh( verts, holeVerts=[[]]):
         vertex.addData3f(pointmap(i.x, i.y))
         normal.addData3f(zUp)
         color.addData4f(bl)
+    debug = notify.getDebug()
     #if len(holeVerts) != 1 and holeVerts[0] != []:
     for w in holeVerts:
         trilator.beginHole()
-        print "new hole"
+        if debug:
+            notify.debug("new hole")
         for j in w:
             # print(j)  # ###################### PRINT #######################
             trilator.addHoleVertex(trilator.addVertex(j.x, j.y))
@@ -198,8 +720,8 @@ def makeTriMesh( verts, holeVerts=[[]]):
     # try:
     trilator.triangulate()
     triVerts = trilator.getVertices()
-    p = trilator.getTriangleV0(0)
-    print "trilator return", p
+    if debug:
+        notify.debug("trilator return {0}".format(trilator.getTriangleV0(0)))
     # except AssertionError:
     #     pass
     # TODO:re-triangulate here and change AdjacencyList to expect a list of triangles rather than call Triangulator funcs
@@ -214,47 +736,21 @@ def makeTriMesh( verts, holeVerts=[[]]):
                              trilator.getTriangleV1(n),
                              trilator.getTriangleV2(n))
     else:  # it's an adjacency list
-
-        for n in xrange(len(trilator.adjLst)):
-            for v in range(0, len(triVerts)):
-                print "\ncurr", triVerts[v], "\nv0", Point2D(trilator.adjLst[n].tri[0].x, trilator.adjLst[n].tri[0].y),\
-                    "\nv1", Point2D(trilator.adjLst[n].tri[1].x, trilator.adjLst[n].tri[1].y),\
-                    "\nv2", Point2D(trilator.adjLst[n].tri[2].x, trilator.adjLst[n].tri[2].y)
-                    # trilator.adjLst[n].tri[0].getXy(),\
-                    # "\nv1", trilator.adjLst[n].tri[1].getXy(),\
-                    # "\nv2", trilator.adjLst[n].tri[2].getXy()
-                # v0 = v1 = v2 = -1
-                if Point2D(trilator.adjLst[n].tri[0].x, trilator.adjLst[n].tri[0].y) == triVerts[v]:
-                    v0 = v  # we need indices into the vertex pool
-                    print "found v0", v0
-
-                if Point2D(trilator.adjLst[n].tri[1].x, trilator.adjLst[n].tri[1].y) == triVerts[v]:
-                    v1 = v
-                    print "found v1", v1
-
-                if Point2D(trilator.adjLst[n].tri[2].x, trilator.adjLst[n].tri[2].y) == triVerts[v]:
-                    v2 = v
-                    print "found v2", v2
-            # if v0 == -1 or v1 == -1 or v2 == -1:
-            #     print "pass", v0, v1, v2
-            #     pass
-            # else:
-            #     print "add"
-
-            # i = triVerts[v0]
-            # vertex.addData3f(pointmap(i.x, i.y))
-            # normal.addData3f(zUp)
-            # color.addData4f(bl)
-            # i = triVerts[v1]
-            # vertex.addData3f(pointmap(i.x, i.y))
-            # normal.addData3f(zUp)
-            # color.addData4f(bl)
-            # i = triVerts[v2]
-            # vertex.addData3f(pointmap(i.x, i.y))
-            # normal.addData3f(zUp)
-            # color.addData4f(bl)
-            print "v 1 2 3", v0, v1, v2
-            prim.addVertices(v0, v1, v2)
+        # index the vertex pool once, so each triangle's corners are looked up rather than searched for
+        vertInds = dict()
+        for v in range(0, len(triVerts)):
+            vertInds[getVertexKey(Point3(triVerts[v].x, triVerts[v].y, 0))] = v  # we need indices into the vertex pool
+        triInds = []
+        for el in trilator.adjLst:
+            triInds.append(vertInds[getVertexKey(el.tri[0])])
+            triInds.append(vertInds[getVertexKey(el.tri[1])])
+            triInds.append(vertInds[getVertexKey(el.tri[2])])
+
+        if bulkIndices:
+            setPrimitiveIndices(prim, triInds)
+        else:
+            for n in xrange(0, len(triInds), 3):
+                prim.addVertices(triInds[n], triInds[n + 1], triInds[n + 2])
 
     prim.closePrimitive()
     geom = Geom(vdata)
@@ -281,7 +777,7 @@ def makeDelaunayTriangulation(triangulator):
         # reverse the vector, so we don't get 180 degrees off by using the opposite vector
         tri1ang12 = abs(tri1vec1.relativeAngleDeg(-tri1vec2))
         tri1ang23 = abs(tri1vec2.relativeAngleDeg(tri1vec3))
-        tri1ang13 = abs(tri1vec1.relativeAngleDeg(-tri1vec3))
+        tri1ang13 = abs(tri1vec1.relativeAngleDeg(tri1vec3))
 
         minAng = min(tri1ang12, tri1ang23, tri1ang13)
 
@@ -290,13 +786,46 @@ def makeDelaunayTriangulation(triangulator):
         tri2vec3 = tri2[0] - tri2[2]
         tri2ang12 = abs(tri2vec1.relativeAngleDeg(-tri2vec2))
         tri2ang23 = abs(tri2vec2.relativeAngleDeg(tri2vec3))
-        tri2ang13 = abs(tri2vec1.relativeAngleDeg(-tri2vec3))
+        tri2ang13 = abs(tri2vec1.relativeAngleDeg(tri2vec3))
 
         if minAng > min(tri2ang12, tri2ang23, tri2ang13):
             minAng = min(tri2ang12, tri2ang23, tri2ang13)
 
         return minAng
 
+    def getNaybAcross(el, ptA, ptB):
+        pts = el.getPoints()
+        if ptA in pts[:2] and ptB in pts[:2]:
+            return el.n12
+        elif ptA in pts[1:] and ptB in pts[1:]:
+            return el.n23
+        return el.n13
+
+    def setNaybAcross(el, ptA, ptB, naybInd):
+        pts = el.getPoints()
+        if ptA in pts[:2] and ptB in pts[:2]:
+            el.n12 = naybInd
+        elif ptA in pts[1:] and ptB in pts[1:]:
+            el.n23 = naybInd
+        else:
+            el.n13 = naybInd
+
+    def replaceNayb(el, oldInd, newInd):
+        if el.n12 == oldInd:
+            el.n12 = newInd
+        elif el.n23 == oldInd:
+            el.n23 = newInd
+        elif el.n13 == oldInd:
+            el.n13 = newInd
+
+    def queueEdge(ind1, ind2):
+        if ind1 is None or ind2 is None:
+            return
+        edge = (min(ind1, ind2), max(ind1, ind2))
+        if edge not in queued:
+            queued.add(edge)
+            worklist.append(edge)
+
     triLst = []
     for i in range(0, triangulator.getNumTriangles()):
         v0 = triangulator.getVertex(triangulator.getTriangleV0(i))
@@ -306,63 +835,60 @@ def makeDelaunayTriangulation(triangulator):
                                       Point3(v1.x, v1.y, 0),
                                       Point3(v2.x, v2.y, 0)))
     triLst = AdjacencyList(triLst)
-    invalidFound = True
-    while invalidFound:
-        print "whild True"
-        for i in range(0, len(triLst.adjLst)):
-            needsReset = False
-            currTri = triLst.adjLst[i]
-            print "currTri\n", currTri
-            if triLst.adjLst[i].n12:  # if there's a neighbour on the 12 edge get it
-                n1 = triLst.adjLst[triLst.adjLst[i].n12]
-            else:
-                n1 = None
-
-            if triLst.adjLst[i].n23:  # if there's a neighbour on the 23 edge get it
-                n2 = triLst.adjLst[triLst.adjLst[i].n23]
-            else:
-                n2 = None
-
-            if triLst.adjLst[i].n13:  # if there's a neighbour on the 12 edge get it
-                n3 = triLst.adjLst[triLst.adjLst[i].n13]
-            else:
-                n3 = None
-            # TODO: arange these from highest to lowest according to their longest shared edge
-            naybs = [n1, n2, n3]
-            for n in naybs:
-                if n is not None:
-                    sharedPts = currTri.getSharedPoints(n)  # two points shared between the triangles
-                    notSharedPt = currTri.getNonSharedPoint(n)  # one point in the current triangle, not in the other
-                    notSharedPtN = n.getNonSharedPoint(currTri)  # one point in the other, not in the current
-                    print "nayb not None"
-                    # make sure this is a convex quadrilateral (else we would cut outside of the two triangles)
-                    # the non-shared point in the other triangle should be in the wedge formed by this triangle
-                    if isPointInWedge(notSharedPtN,
-                                      [sharedPts[0], notSharedPt],
-                                      [sharedPts[1], notSharedPt], inclusive=False):  # don't include points on the edge
-                        # make two new triangles out of the polygon with a test-slice
-                        newCurr = copyAdjLstElement(currTri)
-                        newCurr.setTri(notSharedPt, notSharedPtN, sharedPts[0])
-                        newN = copyAdjLstElement(n)
-                        newN.setTri(notSharedPt, notSharedPtN, sharedPts[1])
-                        print "point in wedge old new curr\n", currTri.tri, "\n", n.tri
-                        minAngOld = getMinAngle(currTri.tri, n.tri)
-                        minAngNew = getMinAngle(newCurr.tri, newN.tri)
-                        if minAngNew > minAngOld:
-                            print "minAngNew > minAngOld"
-                            # maximize the minimum angle == Delaunay Triangulation
-                            triLst.adjLst[i] = newCurr
-                            triLst.adjLst[n.selfInd] = newN
-                            # we've changed the adjacency list
-                            # build a new one
-                            triLst = AdjacencyList(triLst.adjLst)
-                            # start over from the beginning
-                            needsReset = True
-                            break
-            if needsReset:
-                break
-        # if we went through the whole list and didn't find an illegal triangle we're done
-        if i == len(triLst.adjLst) - 1 and not needsReset:
-            invalidFound = False
+    adjLst = triLst.adjLst
+    # every interior edge starts out suspect. An edge is the pair of triangle indices on either side of it.
+    worklist = []
+    queued = set()
+    for currTri in adjLst:
+        for n in currTri.getNaybs():
+            queueEdge(currTri.selfInd, n)
+
+    while worklist:
+        edge = worklist.pop()
+        queued.discard(edge)
+        currTri = adjLst[edge[0]]
+        n = adjLst[edge[1]]
+        if n.selfInd not in currTri.getNaybs():
+            continue  # an earlier flip moved this pair apart
+        sharedPts = currTri.getSharedPoints(n)  # two points shared between the triangles
+        notSharedPt = currTri.getNonSharedPoint(n)  # one point in the current triangle, not in the other
+        notSharedPtN = n.getNonSharedPoint(currTri)  # one point in the other, not in the current
+        # make sure this is a convex quadrilateral (else we would cut outside of the two triangles)
+        # the non-shared point in the other triangle should be in the wedge formed by this triangle
+        if not isPointInWedge(notSharedPtN,
+                              [sharedPts[0], notSharedPt],
+                              [sharedPts[1], notSharedPt], inclusive=False):  # don't include points on the edge
+            continue
+        # make two new triangles out of the polygon with a test-slice
+        newCurr = Triangle(notSharedPt, notSharedPtN, sharedPts[0])
+        newN = Triangle(notSharedPt, notSharedPtN, sharedPts[1])
+        # maximize the minimum angle == Delaunay Triangulation
+        if getMinAngle(newCurr.tri, newN.tri) <= getMinAngle(currTri.tri, n.tri):
+            continue
+
+        # the neighbours across the quad's four outer edges, found before the flip moves the points
+        outerCurr0 = getNaybAcross(currTri, notSharedPt, sharedPts[0])
+        outerCurr1 = getNaybAcross(currTri, notSharedPt, sharedPts[1])
+        outerN0 = getNaybAcross(n, notSharedPtN, sharedPts[0])
+        outerN1 = getNaybAcross(n, notSharedPtN, sharedPts[1])
+        currTri.setTri(notSharedPt, notSharedPtN, sharedPts[0])
+        n.setTri(notSharedPt, notSharedPtN, sharedPts[1])
+        # each triangle keeps one of its old outer edges and takes one from the other triangle
+        setNaybAcross(currTri, notSharedPt, notSharedPtN, n.selfInd)
+        setNaybAcross(currTri, notSharedPt, sharedPts[0], outerCurr0)
+        setNaybAcross(currTri, notSharedPtN, sharedPts[0], outerN0)
+        setNaybAcross(n, notSharedPt, notSharedPtN, currTri.selfInd)
+        setNaybAcross(n, notSharedPtN, sharedPts[1], outerN1)
+        setNaybAcross(n, notSharedPt, sharedPts[1], outerCurr1)
+        # the two outer triangles that changed sides need to point back at their new neighbour
+        if outerN0 is not None:
+            replaceNayb(adjLst[outerN0], n.selfInd, currTri.selfInd)
+        if outerCurr1 is not None:
+            replaceNayb(adjLst[outerCurr1], currTri.selfInd, n.selfInd)
+        # only the edges around the flipped quad can have become illegal
+        queueEdge(currTri.selfInd, outerCurr0)
+        queueEdge(currTri.selfInd, outerN0)
+        queueEdge(n.selfInd, outerN1)
+        queueEdge(n.selfInd, outerCurr1)
 
     return triLst
@@ -0,0 +1,152 @@
+__author__ = 'Lab Hatter'
+"""
+Saves an AdjacencyList to a binary navmesh file and loads it back without triangulating, linking or working out
+widths again.
+
+A file is a header then these sections, each starting on an 8 byte boundary, all little endian:
+    coords      float32, 9 per triangle     pt1, pt2 & pt3 of each triangle, as TriangleArrays keeps them
+    naybs       int32, 3 per triangle       the neighbours across edges 12, 23 & 13, -1 for none
+    flipped     uint8, 1 per triangle       whether tri swaps pt2 and pt3
+    widths      float32, 3 per triangle     the width table, if HAS_WIDTHS is set
+    cellStarts  int32, cols * rows + 1      the PointLocator grid, if HAS_LOCATOR is set (see GridCells)
+    cellTris    int32, numCellEntries
+The vertices are stored at each triangle's corners rather than once each with indices into them, because that's
+the layout AdjacencyList works on, so the loaded sections are used in place.
+
+loadNavMesh maps the file copy-on-write and the arrays it returns are views of the mapping. Nothing is read until
+it's touched, and processes that load the same file share its pages until one of them writes to a triangle.
+"""
+
+import ctypes
+import mmap
+import struct
+import sys
+from array import array
+
+from AdjacencyList import AdjacencyList, TriangleArrays
+from PointLocator import PointLocator
+
+MAGIC = b'NAVM'
+VERSION = 1
+HAS_WIDTHS = 1
+HAS_LOCATOR = 2
+
+# magic, version, flags, numTriangles, minX, minY, cellSize, cols, rows, numCellEntries
+_HEADER = struct.Struct('<4sHHIdddIII')
+_ALIGNMENT = 8
+_IN_PLACE = sys.byteorder == 'little'  # otherwise the sections are copied and byte swapped as they're loaded
+
+
+class GridCells(object):
+    """The cells of a PointLocator grid in two flat arrays. cellTris holds the triangles of every cell, one cell
+    after another, and cell i's are cellTris[cellStarts[i]:cellStarts[i + 1]]."""
+    __slots__ = ('cellStarts', 'cellTris')
+
+    def __init__(self, cellStarts, cellTris):
+        self.cellStarts = cellStarts
+        self.cellTris = cellTris
+
+    def __getitem__(self, i):
+        return self.cellTris[self.cellStarts[i]:self.cellStarts[i + 1]]
+
+    def __len__(self):
+        return len(self.cellStarts) - 1
+
+
+def _align(offset):
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _writeSection(f, typecode, values):
+    """Writes values as an array of typecode, padded up to the next section."""
+    values = array(typecode, values)
+    if not _IN_PLACE:
+        values.byteswap()
+    data = values.tostring()
+    f.write(data)
+    f.write(b'\0' * (_align(len(data)) - len(data)))
+
+
+def saveNavMesh(aLst, path, includeWidths=True, includeLocator=True):
+    """Writes the AdjacencyList to path. Its width table and point locator are computed first if they're included
+    and haven't been yet."""
+    arrays = aLst.arrays
+    flags = 0
+    minX = minY = cellSize = 0.0
+    cols = rows = 0
+    cellStarts = array('i', [0])
+    cellTris = array('i')
+    if includeWidths:
+        flags |= HAS_WIDTHS
+        widths = aLst.getWidthTable()
+    if includeLocator:
+        flags |= HAS_LOCATOR
+        locator = aLst.getPointLocator()
+        minX, minY, cellSize = locator.minX, locator.minY, locator.cellSize
+        cols, rows = locator.cols, locator.rows
+        for i in range(0, len(locator.cells)):
+            cellTris.extend(locator.cells[i])
+            cellStarts.append(len(cellTris))
+
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, flags, len(arrays), minX, minY, cellSize, cols, rows, len(cellTris)))
+        f.write(b'\0' * (_align(_HEADER.size) - _HEADER.size))
+        _writeSection(f, 'f', arrays.coords)
+        _writeSection(f, 'i', arrays.naybs)
+        _writeSection(f, 'B', arrays.flipped)
+        if flags & HAS_WIDTHS:
+            _writeSection(f, 'f', widths)
+        if flags & HAS_LOCATOR:
+            _writeSection(f, 'i', cellStarts)
+            _writeSection(f, 'i', cellTris)
+
+
+def _mapSection(mm, offset, ctype, typecode, count):
+    """Returns the section of count items at offset, and the offset of the next section. The section is a view of
+    the mapping unless its byte order has to be swapped."""
+    size = count * ctypes.sizeof(ctype)
+    if _IN_PLACE:
+        values = (ctype * count).from_buffer(mm, offset)
+    else:
+        values = array(typecode)
+        values.fromstring(mm[offset:offset + size])
+        values.byteswap()
+    return values, _align(offset + size)
+
+
+def loadNavMesh(path):
+    """Returns the AdjacencyList saved at path, with its width table and point locator if they were saved.
+    Raises ValueError if path isn't a navmesh file this version can read."""
+    with open(path, 'rb') as f:
+        # the mapping stays open after the file is closed, for as long as the arrays over it are around
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    if len(mm) < _HEADER.size:
+        raise ValueError("{0} is too short to be a navmesh file".format(path))
+    magic, version, flags, numTris, minX, minY, cellSize, cols, rows, numCellEntries = _HEADER.unpack_from(mm, 0)
+    if magic != MAGIC:
+        raise ValueError("{0} is not a navmesh file".format(path))
+    if version != VERSION:
+        raise ValueError("{0} is navmesh version {1}, only version {2} can be read".format(path, version, VERSION))
+
+    size = _align(_HEADER.size) + _align(36 * numTris) + _align(12 * numTris) + _align(numTris)
+    if flags & HAS_WIDTHS:
+        size += _align(12 * numTris)
+    if flags & HAS_LOCATOR:
+        size += _align(4 * (cols * rows + 1)) + _align(4 * numCellEntries)
+    if len(mm) < size:
+        raise ValueError("{0} is truncated, expected {1} bytes but it has {2}".format(path, size, len(mm)))
+
+    arrays = TriangleArrays()
+    offset = _align(_HEADER.size)
+    arrays.coords, offset = _mapSection(mm, offset, ctypes.c_float, 'f', 9 * numTris)
+    arrays.naybs, offset = _mapSection(mm, offset, ctypes.c_int32, 'i', 3 * numTris)
+    arrays.flipped, offset = _mapSection(mm, offset, ctypes.c_uint8, 'B', numTris)
+    if flags & HAS_WIDTHS:
+        arrays.widths, offset = _mapSection(mm, offset, ctypes.c_float, 'f', 3 * numTris)
+    aLst = AdjacencyList(arrays)
+    if flags & HAS_LOCATOR:
+        cellStarts, offset = _mapSection(mm, offset, ctypes.c_int32, 'i', cols * rows + 1)
+        cellTris, offset = _mapSection(mm, offset, ctypes.c_int32, 'i', numCellEntries)
+        aLst.setPointLocator(PointLocator.fromGrid(aLst.adjLst, minX, minY, cellSize, cols, rows,
+                                                   GridCells(cellStarts, cellTris)))
+    return aLst
@@ -0,0 +1,71 @@
+__author__ = 'Lab Hatter'
+
+from math import sqrt
+from PolygonUtils import triangleContainsPoint
+
+
+class PointLocator(object):
+    """A uniform grid over a triangle mesh. Each cell lists the triangles whose bounding boxes overlap it,
+    so finding the triangle under a point only tests the handful of triangles in one cell."""
+    def __init__(self, adjLst):
+        self.adjLst = adjLst
+        inf = float('inf')
+        self.minX = self.minY = inf
+        maxX = maxY = -inf
+        for t in adjLst:
+            for p in t.tri:
+                self.minX = min(self.minX, p.x)
+                self.minY = min(self.minY, p.y)
+                maxX = max(maxX, p.x)
+                maxY = max(maxY, p.y)
+
+        # size the cells so there is about one triangle per cell
+        width = max(maxX - self.minX, 0.0)
+        height = max(maxY - self.minY, 0.0)
+        self.cellSize = sqrt(width * height / max(len(adjLst), 1))
+        if self.cellSize <= 0.0:
+            self.cellSize = max(width, height, 1.0)
+        self.cols = int(width / self.cellSize) + 1
+        self.rows = int(height / self.cellSize) + 1
+        self.cells = [[] for c in range(0, self.cols * self.rows)]
+        for t in adjLst:
+            xs = (t.tri[0].x, t.tri[1].x, t.tri[2].x)
+            ys = (t.tri[0].y, t.tri[1].y, t.tri[2].y)
+            col0, row0 = self.getCell(min(xs), min(ys))
+            col1, row1 = self.getCell(max(xs), max(ys))
+            for row in range(row0, row1 + 1):
+                for col in range(col0, col1 + 1):
+                    self.cells[row * self.cols + col].append(t.selfInd)
+
+    @classmethod
+    def fromGrid(cls, adjLst, minX, minY, cellSize, cols, rows, cells):
+        """Returns a locator over a grid that's already been built, such as one loaded by NavMeshFile. cells is
+        indexed by row * cols + col and gives the triangle indices in each cell."""
+        locator = cls.__new__(cls)
+        locator.adjLst = adjLst
+        locator.minX = minX
+        locator.minY = minY
+        locator.cellSize = cellSize
+        locator.cols = cols
+        locator.rows = rows
+        locator.cells = cells
+        return locator
+
+    def getCell(self, x, y):
+        """Returns the column and row of the cell holding the point, clamped to the grid."""
+        col = int((x - self.minX) / self.cellSize)
+        row = int((y - self.minY) / self.cellSize)
+        return min(max(col, 0), self.cols - 1), min(max(row, 0), self.rows - 1)
+
+    def locate(self, pt, hint=None):
+        """Returns the index of the triangle that contains the point, or None if the point is off the mesh.
+        hint is a triangle to try first, like the one last found for the same agent, since queries tend to repeat
+        nearby. The locator keeps no state between calls, so any number of searches can share it."""
+        if hint is not None and triangleContainsPoint(pt, self.adjLst[hint].tri):
+            return hint
+
+        col, row = self.getCell(pt.x, pt.y)
+        for ind in self.cells[row * self.cols + col]:
+            if triangleContainsPoint(pt, self.adjLst[ind].tri):
+                return ind
+        return None
@@ -31,25 +31,10 @@ def getSharedEdgeStr(triA, triB):
     return found
 
 
-class Triangle(object):
-    def __init__(self, pt1, pt2, pt3):
-        self.setTri(pt1, pt2, pt3)
-
-
-    def setTri(self, pt1, pt2, pt3):
-
-        tri = [pt1, pt2, pt3]
-        rightVec = tri[1] - tri[0]
-        leftVec = tri[2] - tri[0]
-        if rightVec.cross(leftVec).z < 0:
-            tmp = tri[1]
-            tri[1] = tri[2]
-            tri[2] = tmp
-        self.tri = tri
-        # print "triangle = ", self.tri
-        self.pt1 = pt1
-        self.pt2 = pt2
-        self.pt3 = pt3
+class TrianglePoints(object):
+    """The methods of a triangle, for anything with pt1, pt2 & pt3 in the order they were given and tri, a list of
+    the same points counterclockwise. Triangle stores them, while AdjLstElement reads them out of shared arrays."""
+    __slots__ = ()
 
     def getTri(self):
         return tuple((self.pt1, self.pt2, self.pt3))
@@ -100,6 +85,27 @@ class Triangle(object):
             if pt not in other.tri:
                 return pt
 
+
+class Triangle(TrianglePoints):
+    def __init__(self, pt1, pt2, pt3):
+        self.setTri(pt1, pt2, pt3)
+
+
+    def setTri(self, pt1, pt2, pt3):
+
+        tri = [pt1, pt2, pt3]
+        rightVec = tri[1] - tri[0]
+        leftVec = tri[2] - tri[0]
+        if rightVec.cross(leftVec).z < 0:
+            tmp = tri[1]
+            tri[1] = tri[2]
+            tri[2] = tmp
+        self.tri = tri
+        # print "triangle = ", self.tri
+        self.pt1 = pt1
+        self.pt2 = pt2
+        self.pt3 = pt3
+
     # def __str__(self):
     #     return "dmflksdj;fklj"
     #
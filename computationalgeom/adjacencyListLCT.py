@@ -1,16 +1,216 @@
 #!/usr/bin/python
-from constrainedDelaunayTriangulator import ConstrainedDelaunayTriangulator, Triangle, SimpleCircle
+from array import array
+from math import sqrt
+
+from direct.directnotify.DirectNotify import DirectNotify
+from panda3d.core import GeomTriangles
+
+from computationalgeom.triangle import Triangle
+from utils import EPSILON
+
+notify = DirectNotify().newCategory("LocalClearance")
+
+
+def getSegmentProjection(coords, ind, segStart, segEnd):
+    """Returns (t, distance) of the vertex from the segment's line, where t is how far along the segment its
+    projection falls (0 at segStart, 1 at segEnd) and distance is positive on the segment's left."""
+    i = 3 * ind
+    s = 3 * segStart
+    e = 3 * segEnd
+    dX = coords[e] - coords[s]
+    dY = coords[e + 1] - coords[s + 1]
+    pX = coords[i] - coords[s]
+    pY = coords[i + 1] - coords[s + 1]
+    lenSq = dX * dX + dY * dY
+    return (pX * dX + pY * dY) / lenSq, (dX * pY - dY * pX) / sqrt(lenSq)
+
+
+def getDistanceToSegment(coords, ind, segStart, segEnd):
+    """Returns the distance from the vertex to the nearest point of the segment."""
+    t, dist = getSegmentProjection(coords, ind, segStart, segEnd)
+    if t <= 0:
+        end = segStart
+    elif t >= 1:
+        end = segEnd
+    else:
+        return abs(dist)
+    i = 3 * ind
+    e = 3 * end
+    return sqrt((coords[i] - coords[e]) ** 2 + (coords[i + 1] - coords[e + 1]) ** 2)
 
 
 class LocalClearanceAdjacencyTriangle(Triangle):
     __slots__ = ('_neighbor0', '_neighbor1', '_neighbor2')
 
-    def __init__(self, vindex0, vindex1, vindex2, vertexData, geomTriangles, rewriter):
-        super(LocalClearanceAdjacencyTriangle, self).__init__(vindex0, vindex1, vindex2, vertexData, geomTriangles, rewriter)
+    def __init__(self, vindex0, vindex1, vindex2, vertexData, geomTriangles, rewriter, coords=None, neighbors=None):
+        super(LocalClearanceAdjacencyTriangle, self).__init__(vindex0, vindex1, vindex2, vertexData, geomTriangles,
+                                                              rewriter, coords=coords)
+        if neighbors is None:
+            neighbors = (None, None, None)
+        self._neighbor0, self._neighbor1, self._neighbor2 = neighbors
+
+    def getNeighbors(self, includeEmpties=True):
+        if includeEmpties:
+            return self._neighbor0, self._neighbor1, self._neighbor2
+        else:
+            return filter(lambda n: n is not None, (self._neighbor0, self._neighbor1, self._neighbor2))
 
 
 class LocalClearanceAdjacencyList(object):
-    def __init__(self, vertexData, geomTriangles, rewriter):
+    """
+    A Local Clearance Triangulation made from a constrained ConstrainedDelaunayTriangulator.
+
+    A traversal crosses a triangle through the two edges at one of its corners, and its local clearance is the
+    distance from that corner's vertex to the edge facing it if that edge is constrained, or else to the nearer of the
+    other two vertices. A constrained vertex closer than that to the facing constraint, near enough to it to narrow
+    the way past, disturbs the traversal. Each disturbance is refined away by splitting the constraint where the
+    vertex projects onto it. After that, every traversal's local clearance is its real clearance, so a search only
+    needs the table of them (see getWidthTable) and never has to look past the triangle it's crossing.
+    """
+    def __init__(self, triangulator, maxSteinerPoints=None):
+        """triangulator must already be triangulated with triangulate(constrain=True). Steiner points are added to it."""
+        self.triangulator = triangulator
+        self.table = triangulator.getCornerTable()
+        self.numSteinerPoints = 0
+        if maxSteinerPoints is None:
+            maxSteinerPoints = 4 * triangulator.getNumVertices()
+        self.refine(maxSteinerPoints)
+        self.clearances = self.makeClearances()
+        self.triangles = self.makeTriangles()
+
+    def getLocalClearance(self, c):
+        """Returns the local clearance of the traversal through the corner's two edges."""
+        table = self.table
+        coords = table.coords
+        V = table.V
+        vertex = V[c]
+        nextV = V[table.next(c)]
+        prevV = V[table.prev(c)]
+        if table.constrained[c]:
+            return getDistanceToSegment(coords, vertex, nextV, prevV)
+        i = 3 * vertex
+        n = 3 * nextV
+        p = 3 * prevV
+        return sqrt(min((coords[i] - coords[n]) ** 2 + (coords[i + 1] - coords[n + 1]) ** 2,
+                        (coords[i] - coords[p]) ** 2 + (coords[i + 1] - coords[p + 1]) ** 2))
+
+    def findDisturbance(self, c):
+        """
+        Returns (vertex, t) for the vertex that disturbs the traversal at the constrained corner c and where along the
+        constraint it projects, or None. Only the triangles reached without crossing a constraint, over edges that
+        come within the local clearance of the constraint, are searched.
+        """
+        table = self.table
+        coords = table.coords
+        V = table.V
+        O = table.O
+        segStart = V[table.next(c)]
+        segEnd = V[table.prev(c)]
+        clearance = getDistanceToSegment(coords, V[c], segStart, segEnd)
+        s = 3 * segStart
+        e = 3 * segEnd
+        # a split closer than EPSILON to either end wouldn't make any difference, so t must be past those
+        margin = EPSILON / sqrt((coords[e] - coords[s]) ** 2 + (coords[e + 1] - coords[s + 1]) ** 2)
+        ignore = (V[c], segStart, segEnd)
+        # the triangles are counterclockwise, so the traversal's side is left of segStart to segEnd
+        found = None
+        bestDist = clearance
+        visited = set([c // 3])
+        stack = [c // 3]
+        while stack:
+            tri = stack.pop()
+            for corner in (3 * tri, 3 * tri + 1, 3 * tri + 2):
+                vertex = V[corner]
+                if vertex not in ignore:
+                    t, dist = getSegmentProjection(coords, vertex, segStart, segEnd)
+                    if margin < t < 1 - margin and 0 < dist < bestDist:
+                        found = (vertex, t)
+                        bestDist = dist
+                o = O[corner]
+                if o == -1 or table.constrained[corner] or o // 3 in visited:
+                    continue
+                # only go on over edges that reach into the band over the constraint, nearer than the clearance
+                t1, dist1 = getSegmentProjection(coords, V[table.next(corner)], segStart, segEnd)
+                t2, dist2 = getSegmentProjection(coords, V[table.prev(corner)], segStart, segEnd)
+                if (t1 <= 0 and t2 <= 0) or (t1 >= 1 and t2 >= 1):
+                    continue
+                if (dist1 >= clearance and dist2 >= clearance) or (dist1 <= 0 and dist2 <= 0):
+                    continue
+                visited.add(o // 3)
+                stack.append(o // 3)
+        return found
+
+    def refine(self, maxSteinerPoints):
+        """Splits constraints at the projections of disturbing vertices until no traversal is disturbed."""
+        table = self.table
+        coords = table.coords
+        debug = notify.getDebug()
+        refined = True
+        while refined:
+            refined = False
+            for c in range(0, len(table.V)):
+                if not table.constrained[c]:
+                    continue
+                disturbance = self.findDisturbance(c)
+                if disturbance is None:
+                    continue
+                vertex, t = disturbance
+                segStart = table.V[table.next(c)]
+                segEnd = table.V[table.prev(c)]
+                s = 3 * segStart
+                e = 3 * segEnd
+                x = coords[s] + t * (coords[e] - coords[s])
+                y = coords[s + 1] + t * (coords[e + 1] - coords[s + 1])
+                if self.numSteinerPoints >= maxSteinerPoints:
+                    notify.warning("stopped refining after {0} Steiner points".format(self.numSteinerPoints))
+                    return
+                steiner = self.triangulator.addVertex(x, y, coords[s + 2], bounded=False)
+                table.splitEdge(c, steiner)
+                table.legalizeVertex(steiner)
+                self.numSteinerPoints += 1
+                refined = True
+                if debug:
+                    notify.debug("vertex {0} disturbs {1}-{2}. Split at {3} ({4}, {5})".format(
+                        vertex, segStart, segEnd, steiner, x, y))
+
+    def makeClearances(self):
+        """Returns an array('f') of the local clearance of every corner's traversal."""
+        return array('f', [self.getLocalClearance(c) for c in range(0, len(self.table.V))])
+
+    def makeTriangles(self):
+        """Returns a LocalClearanceAdjacencyTriangle for each triangle of the table, drawn into a new GeomTriangles."""
+        triangulator = self.triangulator
+        self.geomTriangles = GeomTriangles(triangulator._usage)
+        triangles = []
+        for tri in range(0, len(self.table)):
+            v0, v1, v2 = self.table.getTriangleVertices(tri)
+            triangles.append(LocalClearanceAdjacencyTriangle(v0, v1, v2, triangulator.getGeomVertexData(),
+                                                             self.geomTriangles, triangulator._vertexRewriter,
+                                                             coords=triangulator._coords,
+                                                             neighbors=self.table.getNeighbors(tri)))
+        return triangles
+
+    def getClearance(self, tri, edge1, edge2):
+        """Returns the clearance of crossing the triangle through two of its edges, 0, 1 or 2."""
+        # the edges either side of corner k are k and k - 1
+        shared = edge1 if (edge1 - 1) % 3 == edge2 else edge2
+        return self.clearances[3 * tri + shared]
+
+    def getWidthTable(self):
+        """Returns the clearances in the layout of AdjacencyList.getWidthTable, which is w2313, w1213, w1223 per
+        triangle, for the AdjacencyList from getAdjacencyList()."""
+        clearances = self.clearances
+        widths = array('f')
+        for c in range(0, len(clearances), 3):
+            widths.extend((clearances[c + 2], clearances[c], clearances[c + 1]))
+        return widths
+
+    def getAdjacencyList(self):
+        """Returns a PolygonUtils AdjacencyList of the refined mesh, with its width table already filled in."""
+        from PolygonUtils.AdjacencyList import AdjacencyList
+        aLst = AdjacencyList(self.table)
+        aLst.setWidthTable(self.getWidthTable())
+        return aLst
 
-# class AdjacencyListCDT(ConstrainedDelaunayTriangulator):
-#     """An Adjacency List made of a Constrained Delaunay Triangulation using Panda3D's vertex system"""
+    def __len__(self):
+        return len(self.triangles)
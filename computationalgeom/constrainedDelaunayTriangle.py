@@ -2,86 +2,61 @@
 from direct.directnotify.DirectNotify import DirectNotify
 
 from collections import namedtuple
-from computationalgeom.triangle import Triangle
+from computationalgeom.triangle import Triangle, PrimitiveInterface, SHARED_EDGE0, SHARED_EDGE1, SHARED_EDGE2
 from computationalgeom.utils import isPointInWedge
+from computationalgeom.predicates import orient2d, incircle
 
 notify = DirectNotify().newCategory("constrainedDelaunayAdjacencyTriangle")
 
 
 class ConstrainedDelaunayAdjacencyTriangle(Triangle):
     __slots__ = ('_neighbor0', '_neighbor1', '_neighbor2', )
+    # how isLegal decides: 'incircle' tests the far vertex against the circumcircle, 'angles' compares the minimum
+    # angles before and after the flip, and 'verify' does both and warns whenever they disagree
+    legalityMode = 'incircle'
 
-    @classmethod
-    def setAllNeighbors(cls, neighborTriangles, _fullList):
-        for tri in neighborTriangles:
-            needsAdded = []
-            if tri._neighbor0 in neighborTriangles:
-                tri._neighbor0 = None
-            elif tri._neighbor0 is not None:
-                needsAdded.append(_fullList[tri._neighbor0])
-                tri._neighbor0 = None
-            if tri._neighbor1 in neighborTriangles:
-                tri._neighbor1 = None
-            elif tri._neighbor1 is not None:
-                needsAdded.append(_fullList[tri._neighbor1])
-                tri._neighbor1 = None
-            if tri._neighbor2 in neighborTriangles:
-                tri._neighbor2 = None
-            elif tri._neighbor2 is not None:
-                needsAdded.append(_fullList[tri._neighbor2])
-                tri._neighbor2 = None
-
-            for add in needsAdded:
-                shared = tri.getSharedFeatures(add)
-                if shared.edge0:
-                    tri._neighbor0 = add.index
-                if shared.edge1:
-                    tri._neighbor1 = add.index
-                if shared.edge2:
-                    tri._neighbor2 = add.index
-        ni = -1
-        global notify
-        notify.warning('neighborTriangles indices {}'.format([neighborTriangles[i].index for i in range(0, len(neighborTriangles))]))
-        notify.warning("setAllNeighbors needsAdded {}".format([needsAdded[j] for j in range(0, len(needsAdded))]))
-        for tri1 in neighborTriangles:
-            ni += 1
-            for tri2 in neighborTriangles:
-                if tri2.index == tri1.index:
-                    continue
-                shared1 = tri1.getSharedFeatures(tri2)
-                shared2 = tri2.getSharedFeatures(tri1)
-                numNeighborsSet = 0
-                if shared1.edge0 is True:
-                    tri1._neighbor0 = tri2.index
-                    numNeighborsSet += 1
-                if shared1.edge1 is True:
-                    tri1._neighbor1 = tri2.index
-                    numNeighborsSet += 1
-                if shared1.edge2 is True:
-                    tri1._neighbor2 = tri2.index
-                    numNeighborsSet += 1
-                assert numNeighborsSet < 2  # a triangle cannot neighbor more than one side
-                numNeighborsSet = 0
-                if shared2.edge0 is True:
-                    tri2._neighbor0 = tri1.index
-                    numNeighborsSet += 1
-                if shared2.edge1 is True:
-                    tri2._neighbor1 = tri1.index
-                    numNeighborsSet += 1
-                if shared2.edge2 is True:
-                    tri2._neighbor2 = tri1.index
-                    numNeighborsSet += 1
-                assert numNeighborsSet < 2  # a triangle cannot neighbor more than one side
-                notify.warning("1: ind: {}, points {}, neighbors {}".format(tri1.index, tri1.getPointIndices(), tri1.getNeighbors()))
-                notify.warning("2: ind: {}, points {}, neighbors {}".format(tri2.index, tri2.getPointIndices(), tri2.getNeighbors()))
+    @staticmethod
+    def getEdgeKey(ind1, ind2):
+        """Returns the edge between two vertex indices as a tuple that's the same in either direction."""
+        return (ind1, ind2) if ind1 < ind2 else (ind2, ind1)
 
+    @classmethod
+    def relinkNeighbors(cls, pieces, outerNeighbors, _fullList):
+        """
+        Sets the neighbors of triangles made by splitting or flipping other triangles. An edge two pieces have in
+        common links those pieces. Any other edge was an edge of the triangles before the change, so it links to the
+        neighbor that was across it in outerNeighbors {edgeKey: index or None}, and that neighbor's link across the
+        edge is pointed back at the piece. Only the pieces and the triangles bordering them are touched.
+        """
+        edges = {}
+        for piece in pieces:
+            inds = piece.getPointIndices()
+            edges.setdefault(cls.getEdgeKey(inds[0], inds[1]), []).append((piece, 0))
+            edges.setdefault(cls.getEdgeKey(inds[1], inds[2]), []).append((piece, 1))
+            edges.setdefault(cls.getEdgeKey(inds[2], inds[0]), []).append((piece, 2))
+        for edgeKey, sides in edges.iteritems():
+            if len(sides) == 2:
+                (piece1, edge1), (piece2, edge2) = sides
+                piece1.setNeighbor(edge1, piece2.index)
+                piece2.setNeighbor(edge2, piece1.index)
+            elif len(sides) == 1:
+                piece, edge = sides[0]
+                # a half of an edge split by a new point isn't in outerNeighbors. It only has one piece on it when
+                # nothing was across the edge, like on the hull, so nothing is across it now either
+                nayb = outerNeighbors.get(edgeKey)
+                piece.setNeighbor(edge, nayb)
+                if nayb is not None:
+                    other = _fullList[nayb]
+                    other.setNeighbor(other.getEdgeWithPoints(*edgeKey), piece.index)
+            else:
+                raise ValueError("Edge {0} is shared by {1} triangles".format(edgeKey, len(sides)))
 
     class AdjacencyTuple(namedtuple("AdjacencyTuple", 'index neighbor0 neighbor1 neighbor2')):
         __slots__ = ()
 
-    def __init__(self, vindex0, vindex1, vindex2, vertexData, geomTriangles, rewriter, adjTuple=None):
+    def __init__(self, vindex0, vindex1, vindex2, vertexData, geomTriangles, rewriter, adjTuple=None, coords=None):
         super(ConstrainedDelaunayAdjacencyTriangle, self).__init__(vindex0, vindex1, vindex2,
-                                                                   vertexData, geomTriangles, rewriter)
+                                                                   vertexData, geomTriangles, rewriter, coords=coords)
         if adjTuple is not None:
             self._neighbor0 = adjTuple.neighbor0
             self._neighbor1 = adjTuple.neighbor1
@@ -92,130 +67,98 @@ class ConstrainedDelaunayAdjacencyTriangle(Triangle):
             self._neighbor2 = None
 
     # ##################### NEW For Make Delaunay ##########################
-    def legalize(self, newPoint, _triangleList, other=None):
-        # BLOG optimal throw (most of the time there will be a neighbor, hence try rather than if)
-        if other is None:
-            nei = None
-            if newPoint not in self.edge0:
-                nei = self._neighbor0
-            elif newPoint not in self.edge1:
-                nei = self._neighbor1
-            elif newPoint not in self.edge2:
-                nei = self._neighbor2
-
-            try:
-                other = _triangleList[nei]
-            except TypeError:
-                if nei is None:
-                   return
-                else:
-                    # http://nedbatchelder.com/blog/200711/rethrowing_exceptions_in_python.html (confirmed to raise original)
-                    raise
-
-        if other is not None:
-            trianglesSwapped = []
-            # get the shared edge. So, we can make 'ghost' triangles, and save on redundant calculations
+    def legalize(self, pointIndex, _triangleList, dirtyEdges=None):
+        """
+        Flips edges until the triangles around the newly inserted vertex pointIndex are Delaunay. This triangle must
+        be one of them. Only the edges facing the new vertex can become illegal, so those are kept on a stack and
+        each flip pushes the two edges it brings to face the vertex. dirtyEdges is a bytearray with a flag per
+        triangle edge (3 * index + edge) marking the edges on the stack. Passing the same one for every insertion
+        saves making it again. Returns the number of flips.
+        """
+        global notify
+        debug = notify.getDebug()
+        if dirtyEdges is None:
+            dirtyEdges = bytearray()
+        if len(dirtyEdges) < 3 * len(_triangleList):
+            dirtyEdges.extend(bytearray(3 * len(_triangleList) - len(dirtyEdges)))
+        stack = []
+        for tri in self.getTrianglesAround(pointIndex, _triangleList):
+            slot = tri.getEdgeSlotFacing(pointIndex)
+            if not dirtyEdges[slot]:
+                dirtyEdges[slot] = 1
+                stack.append(slot)
+
+        flips = 0
+        while stack:
+            slot = stack.pop()
+            dirtyEdges[slot] = 0
+            tri = _triangleList[slot // 3]
+            nayb = tri.getNeighbors()[slot % 3]
+            if nayb is None:
+                continue
+            other = _triangleList[nayb]
+            sharedFeatures = tri.getSharedFeatures(other)
+            if tri.isLegal(other, sharedFeatures):
+                continue
+            if debug:
+                notify.debug("legalize flip {0}:{1} and {2}:{3}".format(tri.index, tri.getPointIndices(),
+                                                                         other.index, other.getPointIndices()))
+            tri.flip(other, _triangleList, sharedFeatures)
+            flips += 1
+            # both triangles now have the new vertex, and the edges facing it are the ones that were other's
+            for flipped in (tri, other):
+                slot = flipped.getEdgeSlotFacing(pointIndex)
+                if not dirtyEdges[slot]:
+                    dirtyEdges[slot] = 1
+                    stack.append(slot)
+        return flips
+
+    def flip(self, other, _triangleList, sharedFeatures=None):
+        """Swaps the edge shared with other for the one between the two points they don't share, reusing both
+        triangles, and relinks the neighbors around them."""
+        if sharedFeatures is None:
             sharedFeatures = self.getSharedFeatures(other)
-            otherShared = other.getSharedFeatures(self)
-            global notify
-            # Record the edges that we'll need to legalize afterwards.
-            if not self.isLegal(other, sharedFeatures):
-                if otherShared.edge0:  # will throw an undefined var err further down if this block doesn't resolve
-                    unsharedEdge1 = other.edgeIndices1
-                    unsharedEdge2 = other.edgeIndices2
-                elif otherShared.edge1:
-                    unsharedEdge1 = other.edgeIndices0
-                    unsharedEdge2 = other.edgeIndices2
-                elif otherShared.edge2:
-                    unsharedEdge1 = other.edgeIndices0
-                    unsharedEdge2 = other.edgeIndices1
-                # save these two and their neighbors so we can reset their relationships after edge swaps
-                trianglesSwapped.extend(self.getNeighbors(includeEmpties=False))
-                trianglesSwapped.extend(other.getNeighbors(includeEmpties=False))
-                trianglesSwapped.extend((self.index, other.index))
-                trianglesSwapped = [_triangleList[tri] for tri in trianglesSwapped]
-
-                notify.warning("legalize self {0}:{1} n:{2}".format(self.index,
-                                                                         self.getPointIndices(),
-                                                                         self.getNeighbors()))
-                notify.warning("legalize other {0}:{1} n:{2}".format(other.index,
-                                                                          other.getPointIndices(),
-                                                                          other.getNeighbors()))
-                # swap self. Set other to its new edge.
-                if sharedFeatures.edge0:
-                    self.pointIndex1 = sharedFeatures.otherIndicesNotShared[0]
-                elif sharedFeatures.edge1:
-                    self.pointIndex2 = sharedFeatures.otherIndicesNotShared[0]
-                elif sharedFeatures.edge2:
-                    self.pointIndex0 = sharedFeatures.otherIndicesNotShared[0]
-                else:
-                    raise ValueError("No shared edge between {0} and {1}".format(self.index, other.index))
-
-                if otherShared.edge0:
-                    other.pointIndex1 = sharedFeatures.indicesNotShared[0]
-                elif otherShared.edge1:
-                    other.pointIndex2 = sharedFeatures.indicesNotShared[0]
-                elif otherShared.edge2:
-                    other.pointIndex0 = sharedFeatures.indicesNotShared[0]
-                else:
-                    raise ValueError("No shared edge between {0} and {1}".format(self.index, other.index))
-
-                # reset neighbors, so we can recurse on the next edges
-                ConstrainedDelaunayAdjacencyTriangle.setAllNeighbors(trianglesSwapped, _triangleList)
-                foundEdges = 0
-                # find the new edge in self that used to be an unshared edge
-                nextOther = None
-                if (unsharedEdge1[0] in self.edgeIndices0 and unsharedEdge1[1] in self.edgeIndices0 or
-                                unsharedEdge2[0] in self.edgeIndices0 and unsharedEdge2[1] in self.edgeIndices0):
-                    foundEdges += 1
-                    if self._neighbor0 is not None:
-                        nextOther = _triangleList[self._neighbor0]
-                elif (unsharedEdge1[0] in self.edgeIndices1 and unsharedEdge1[1] in self.edgeIndices1 or
-                                  unsharedEdge2[0] in self.edgeIndices1 and unsharedEdge2[1] in self.edgeIndices1):
-                    foundEdges += 1
-                    if self._neighbor1 is not None:
-                        nextOther = _triangleList[self._neighbor1]
-                elif (unsharedEdge1[0] in self.edgeIndices2 and unsharedEdge1[1] in self.edgeIndices2 or
-                                  unsharedEdge2[0] in self.edgeIndices2 and unsharedEdge2[1] in self.edgeIndices2):
-                    foundEdges += 1
-                    if self._neighbor2 is not None:
-                        nextOther = _triangleList[self._neighbor2]
-
-                # check validity & legalize edge on self
-                if foundEdges != 1:
-                    notify.warning("foundEdges not equalling 1. unsharedE1: {} unsharedE2 {} self edge0 {} edge1 {} edge1 {}".format(
-                        unsharedEdge1, unsharedEdge2, self.edge0, self.edge1, self.edge2,
-                    ))
-                self.legalize(newPoint, _triangleList, other=nextOther)
-
-                # find the new edge in other that used to be an unshared edge
-                nextOther = None
-                if (unsharedEdge1[0] in other.edgeIndices0 and unsharedEdge1[1] in other.edgeIndices0 or
-                                unsharedEdge2[0] in other.edgeIndices0 and unsharedEdge2[1] in other.edgeIndices0):
-                    foundEdges += 1
-                    if other._neighbor0 is not None:
-                        nextOther = _triangleList[other._neighbor0]
-                elif (unsharedEdge1[0] in other.edgeIndices1 and unsharedEdge1[1] in other.edgeIndices1 or
-                                  unsharedEdge2[0] in other.edgeIndices1 and unsharedEdge2[1] in other.edgeIndices1):
-                    foundEdges += 1
-                    if other._neighbor1 is not None:
-                        nextOther = _triangleList[other._neighbor1]
-                elif (unsharedEdge1[0] in other.edgeIndices2 and unsharedEdge1[1] in other.edgeIndices2 or
-                                  unsharedEdge2[0] in other.edgeIndices2 and unsharedEdge2[1] in other.edgeIndices2):
-                    foundEdges += 1
-                    if other._neighbor2 is not None:
-                        nextOther = _triangleList[other._neighbor2]
-
-                # check validity & legalize edge on other
-                if foundEdges != 2:
-                    notify.warning("foundEdges not equalling 2. unsharedE1: {} unsharedE2 {} self edge0 {} edge1 {} edge1 {}".format(
-                        unsharedEdge1, unsharedEdge2, self.edge0, self.edge1, self.edge2,
-                    ))
-                other.legalize(newPoint, _triangleList, other=nextOther)
-
-            else:
-                notify.warning("legalize isLegal => no swap")
-
+        otherShared = other.getSharedFeatures(self)
+        # save the neighbors around the quad so we can reset their relationships after edge swaps
+        outerNeighbors = other.getEdgeNeighbors(self.getEdgeNeighbors())
+        # swap self. Set other to its new edge.
+        if sharedFeatures.edge0:
+            self.pointIndex1 = sharedFeatures.otherIndicesNotShared[0]
+        elif sharedFeatures.edge1:
+            self.pointIndex2 = sharedFeatures.otherIndicesNotShared[0]
+        elif sharedFeatures.edge2:
+            self.pointIndex0 = sharedFeatures.otherIndicesNotShared[0]
+        else:
+            raise ValueError("No shared edge between {0} and {1}".format(self.index, other.index))
+
+        if otherShared.edge0:
+            other.pointIndex1 = sharedFeatures.indicesNotShared[0]
+        elif otherShared.edge1:
+            other.pointIndex2 = sharedFeatures.indicesNotShared[0]
+        elif otherShared.edge2:
+            other.pointIndex0 = sharedFeatures.indicesNotShared[0]
+        else:
+            raise ValueError("No shared edge between {0} and {1}".format(self.index, other.index))
+        ConstrainedDelaunayAdjacencyTriangle.relinkNeighbors((self, other), outerNeighbors, _triangleList)
+
+    def getEdgeSlotFacing(self, pointIndex):
+        """Returns 3 * index + edge for the edge of this triangle across from one of its points."""
+        # edge0 (points 0-1) faces point 2, edge1 (1-2) faces point 0 and edge2 (2-0) faces point 1
+        return 3 * self._selfIndex + (self.getPointIndices().index(pointIndex) + 1) % 3
+
+    def getTrianglesAround(self, pointIndex, _triangleList):
+        """Returns the triangles that have the point, found by stepping across the edges that meet at it from this
+        triangle, which must have it too."""
+        around = [self]
+        seen = set([self._selfIndex])
+        i = 0
+        while i < len(around):
+            for nayb in around[i].getNeighbors():
+                if nayb is not None and nayb not in seen and pointIndex in _triangleList[nayb].getPointIndices():
+                    seen.add(nayb)
+                    around.append(_triangleList[nayb])
+            i += 1
+        return around
 
     def _getDummiesAndAngles(self, sharedFeatures):
         if sharedFeatures.numSharedPoints != 2:
@@ -231,23 +174,55 @@ class ConstrainedDelaunayAdjacencyTriangle(Triangle):
         ghostInds1 = Triangle.getCcwOrder(sharedEdgeIndices[0],
                                           sharedFeatures.otherIndicesNotShared[0],
                                           sharedFeatures.indicesNotShared[0],
-                                          self._rewriter)
+                                          self._getVertexSource())
         ghostInds2 = Triangle.getCcwOrder(sharedFeatures.otherIndicesNotShared[0],
                                           sharedEdgeIndices[1],
                                           sharedFeatures.indicesNotShared[0],
-                                          self._rewriter)
+                                          self._getVertexSource())
 
         ghostTriMin1 = Triangle.getDummyMinAngleDeg(ghostInds1[0], ghostInds1[1], ghostInds1[2],
-                                                    self._rewriter)
+                                                    self._getVertexSource())
         ghostTriMin2 = Triangle.getDummyMinAngleDeg(ghostInds2[0], ghostInds2[1], ghostInds2[2],
-                                                    self._rewriter)
+                                                    self._getVertexSource())
         return ghostInds1, ghostInds2, ghostTriMin1, ghostTriMin2
 
     def isLegal(self, other, sharedFeatures=None):
+        """Returns False if flipping the edge shared with other would make the pair of triangles Delaunay."""
+        if sharedFeatures is None:
+            sharedFeatures = self.getSharedFeatures(other)
+        mode = ConstrainedDelaunayAdjacencyTriangle.legalityMode
+        if mode == 'angles':
+            return self.isLegalByAngles(other, sharedFeatures)
+        legal = self.isLegalByIncircle(sharedFeatures.otherIndicesNotShared[0])
+        if mode == 'verify':
+            byAngles = self.isLegalByAngles(other, sharedFeatures)
+            if byAngles != legal:
+                notify.warning("isLegal incircle says {0} but angles say {1} for {2} and {3}".format(
+                    legal, byAngles, self.getPointIndices(), other.getPointIndices()))
+        elif mode != 'incircle':
+            raise ValueError("Unknown legalityMode {0}. Use 'incircle', 'angles' or 'verify'.".format(mode))
+        return legal
+
+    def isLegalByIncircle(self, ind):
+        """Returns True unless the vertex at index ind is strictly inside this triangle's circumcircle."""
+        vertexSource = self._getVertexSource()
+        ind0, ind1, ind2 = self.getPointIndices()
+        pt0 = PrimitiveInterface.readData3f(ind0, vertexSource)
+        pt1 = PrimitiveInterface.readData3f(ind1, vertexSource)
+        pt2 = PrimitiveInterface.readData3f(ind2, vertexSource)
+        pt3 = PrimitiveInterface.readData3f(ind, vertexSource)
+        inside = incircle(pt0[0], pt0[1], pt1[0], pt1[1], pt2[0], pt2[1], pt3[0], pt3[1])
+        if orient2d(pt0[0], pt0[1], pt1[0], pt1[1], pt2[0], pt2[1]) < 0:
+            inside = -inside  # incircle expects the circle's points counterclockwise
+        return inside <= 0
+
+    def isLegalByAngles(self, other, sharedFeatures=None):
+        """Returns False if flipping the edge shared with other would raise the smaller of the two triangles' minimum
+        angles. This is the test isLegal used before the incircle test, and gives the same answers for
+        non-cocircular points."""
         if sharedFeatures is None:
             sharedFeatures = self.getSharedFeatures(other)
-        self._rewriter.setRow(sharedFeatures.otherIndicesNotShared[0])
-        point = self._rewriter.getData3f()
+        point = self.getGeomVertex(sharedFeatures.otherIndicesNotShared[0])
         # we can't swap the edges unless the new edge cuts across the shared edge
         if sharedFeatures.edge0 and not self.isPointVisibleOverEdge0(point, inclusive=False):
             return True  # True here means the alternative is illegal
@@ -260,7 +235,7 @@ class ConstrainedDelaunayAdjacencyTriangle(Triangle):
         ghostInds1, ghostInds2, ghostTriMin1, ghostTriMin2 = self._getDummiesAndAngles(sharedFeatures)
         dummyMinAng = min(ghostTriMin1, ghostTriMin2)
         # First 2 conditions for when the fake triangles are degenerate (collinear). Keep the current arrangement
-        return ghostTriMin1 <= 0 or ghostTriMin1 <= 0 or dummyMinAng <= currentMinAng
+        return ghostTriMin1 <= 0 or ghostTriMin2 <= 0 or dummyMinAng <= currentMinAng
 
     def isPointVisibleOverEdge0(self, point, inclusive=False):
         return isPointInWedge(point, self.edge1[::-1], self.edge2, inclusive=inclusive)
@@ -300,6 +275,27 @@ class ConstrainedDelaunayAdjacencyTriangle(Triangle):
 
     # ##################### NEW For Make Delaunay  ABOVE ##########################
 
+    def getEdgeNeighbors(self, edgeNeighbors=None):
+        """Adds {edgeKey: neighbor index or None} for each edge of this triangle to edgeNeighbors and returns it."""
+        if edgeNeighbors is None:
+            edgeNeighbors = {}
+        ind0, ind1, ind2 = self.getPointIndices()
+        edgeNeighbors[ConstrainedDelaunayAdjacencyTriangle.getEdgeKey(ind0, ind1)] = self._neighbor0
+        edgeNeighbors[ConstrainedDelaunayAdjacencyTriangle.getEdgeKey(ind1, ind2)] = self._neighbor1
+        edgeNeighbors[ConstrainedDelaunayAdjacencyTriangle.getEdgeKey(ind2, ind0)] = self._neighbor2
+        return edgeNeighbors
+
+    def setNeighbor(self, edge, index):
+        """Sets the neighbor across edge 0, 1 or 2."""
+        if edge == 0:
+            self._neighbor0 = index
+        elif edge == 1:
+            self._neighbor1 = index
+        elif edge == 2:
+            self._neighbor2 = index
+        else:
+            raise ValueError("No edge {0}. Triangles have edges 0, 1 and 2.".format(edge))
+
     def getNeighbors(self, includeEmpties=True):
         if includeEmpties:
             return self._neighbor0, self._neighbor1, self._neighbor2
@@ -328,69 +324,48 @@ class ConstrainedDelaunayAdjacencyTriangle(Triangle):
         Triangulates a point that lays within this triangle, either on its interior or its edge.
         Then it returns the new triangles.
         """
-        self._rewriter.setRow(pointIndex)
-        point = self._rewriter.getData3f()
-        slf = self.asPointsEnum()
+        point = self.getGeomVertex(pointIndex)
         newTriangles = []
         global notify
-        notify.warning("Triangulate Point\n\tpoint: {}\n\tself: {}".format(point, self))
-        oldTriangles = [self, ]
+        debug = notify.getDebug()
+        if debug:
+            notify.debug("Triangulate Point\n\tpoint: {}\n\tself: {}".format(point, self))
         if self.containsPoint(point, includeEdges=False):
-            notify.warning("containsPoint self:\n\t{0}".format(self))
+            if debug:
+                notify.debug("containsPoint self:\n\t{0}".format(self))
             newTriangles = self._triangulateSelf(pointIndex, _triangleList)
-            notify.warning("containsPoint newTriangle:\n\t{0}".format(newTriangles))
+            if debug:
+                notify.debug("containsPoint newTriangle:\n\t{0}".format(newTriangles))
         else:
-            # if the point is on the edge
-            newTriangle, onEdge = self._triangulateOnEdge(pointIndex, point, slf)
-            notify.warning("_triangulateOnEdge() neighbors: {0}".format(self.getNeighbors()))
-            if onEdge == '0' and self._neighbor0 is not None:  # triangulate the neighbor on the edge incident to the point
-                other = _triangleList[self._neighbor0]
-                oldTriangles.append(other)
-                newTriangles.append(newTriangle)
-                newTriangle2, _ = other._triangulateOnEdge(pointIndex, point, self)
+            # if the point is on the edge, split this triangle and the one across that edge, if there is one
+            outerNeighbors = self.getEdgeNeighbors()
+            pieces = [self]
+            newTriangle, onEdge = self._triangulateOnEdge(pointIndex, point)
+            if newTriangle is None:
+                return newTriangles
+            pieces.append(newTriangle)
+            newTriangles.append(newTriangle)
+            if debug:
+                notify.debug("_triangulateOnEdge() onEdge {0} neighbors: {1}".format(onEdge, self.getNeighbors()))
+            nayb = self.getNeighbors()[int(onEdge)]  # the links aren't reset yet, so this is still across the old edge
+            if nayb is not None:
+                other = _triangleList[nayb]
+                other.getEdgeNeighbors(outerNeighbors)
+                pieces.append(other)
+                newTriangle2, _ = other._triangulateOnEdge(pointIndex, point)
                 if newTriangle2 is not None:
+                    pieces.append(newTriangle2)
                     newTriangles.append(newTriangle2)
-                notify.warning("'0' _triangulateOtherEdge()")
-            elif onEdge == '1' and self._neighbor1 is not None:
-                other = _triangleList[self._neighbor1]
-                oldTriangles.append(other)
-                newTriangles.append(newTriangle)
-                newTriangle2, _ = other._triangulateOnEdge(pointIndex, point, self)
-                if newTriangle2 is not None:
-                    newTriangles.append(newTriangle2)
-                notify.warning("'1' _triangulateOtherEdge()")
-            elif onEdge == '2' and self._neighbor2 is not None:
-                other = _triangleList[self._neighbor2]
-                oldTriangles.append(other)
-                newTriangles.append(newTriangle)
-                newTriangle2, _ = other._triangulateOnEdge(pointIndex, point, self)
-                if newTriangle2 is not None:
-                    newTriangles.append(newTriangle2)
-                notify.warning("'2' _triangulateOtherEdge()")
-            else:
-                notify.warning("No change. The edge was None. newTriangle {}".format(newTriangle))
-                newTriangles.append(newTriangle)  # the edge was none
-            # get the old triangle neighbors
-            oldies = oldTriangles[:]
-            for tri in oldTriangles:
-                naybs = list(tri.getNeighbors(includeEmpties=False))
-                for i in range(0, len(naybs)):
-                    try:
-                        naybs[i] = _triangleList[naybs[i]]
-                    except IndexError:
-                        assert naybs[i] in newTriangles
-                        naybs[i] = None
-
-                naybs = filter(lambda n: n is not None, naybs)
-                oldies.extend(naybs)
-
-            ConstrainedDelaunayAdjacencyTriangle.setAllNeighbors(newTriangles + oldies, _triangleList)
+            elif debug:
+                notify.debug("No change. The edge was None. newTriangle {}".format(newTriangle))
+            ConstrainedDelaunayAdjacencyTriangle.relinkNeighbors(pieces, outerNeighbors, _triangleList)
         return newTriangles
 
     def _triangulateSelf(self, pointIndex, _triangleList):
         """Triangulate the triangle when the dividing point occurs in the interior of this triangle."""
         if pointIndex in (self.pointIndex0, self.pointIndex1, self.pointIndex2):
             return []
+        outerNeighbors = self.getEdgeNeighbors()
         # the new point always takes the original triangle's point1
         pInd2 = self.pointIndex2
         pInd1 = self.pointIndex1
@@ -401,29 +376,23 @@ class ConstrainedDelaunayAdjacencyTriangle(Triangle):
         newTriangle1 = ConstrainedDelaunayAdjacencyTriangle(pInd0, pInd1, pointIndex,
                                                             self._primitiveInterface.vdata,
                                                             self._primitiveInterface.primitives,
-                                                            self._rewriter)
+                                                            self._rewriter, coords=self._coords)
         newTriangle2 = ConstrainedDelaunayAdjacencyTriangle(pointIndex, pInd1, pInd2,
                                                             self._primitiveInterface.vdata,
                                                             self._primitiveInterface.primitives,
-                                                            self._rewriter)
-        listToFix = [newTriangle1, newTriangle2]
-        listToFix.append(self)
-        naybs = list(self.getNeighbors(includeEmpties=False))
-        for n in range(0, len(naybs)):
-            naybs[n] = _triangleList[naybs[n]]
-        listToFix.extend(naybs)
-        ConstrainedDelaunayAdjacencyTriangle.setAllNeighbors(listToFix, _triangleList)
+                                                            self._rewriter, coords=self._coords)
+        ConstrainedDelaunayAdjacencyTriangle.relinkNeighbors((self, newTriangle1, newTriangle2), outerNeighbors,
+                                                             _triangleList)
         return [newTriangle1, newTriangle2]
 
-    def _triangulateOnEdge(self, pointIndex, point, slf):
+    def _triangulateOnEdge(self, pointIndex, point):
         """Triangulate the triangle when the dividing point lies in the boundary."""
-        if isinstance(slf, ConstrainedDelaunayAdjacencyTriangle):
-            slf = self.asPointsEnum()
-        onEdge = self.getOccupiedEdge(point, slf)
+        onEdge = self.getOccupiedEdge(point)
         originalInds = self.getPointIndices()
         if pointIndex in originalInds:
             return None, onEdge
-        notify.warning("in _triangulateOnEdge()\n\tonEdge {}".format(onEdge))
+        if notify.getDebug():
+            notify.debug("in _triangulateOnEdge()\n\tonEdge {}".format(onEdge))
         if onEdge == '0':
             reformedTrianglePointsI = (originalInds[0], pointIndex, originalInds[2])
             newTrianglePointsI = (originalInds[1], originalInds[2], pointIndex)
@@ -445,7 +414,7 @@ class ConstrainedDelaunayAdjacencyTriangle(Triangle):
         self.setPointIndices(*reformedTrianglePointsI)
         newTriangle = ConstrainedDelaunayAdjacencyTriangle(newTrianglePointsI[0], newTrianglePointsI[1], newTrianglePointsI[2],
                                                            self._primitiveInterface.vdata, self._primitiveInterface.primitives,
-                                                           self._rewriter)
+                                                           self._rewriter, coords=self._coords)
         return newTriangle, onEdge
 
     def __str__(self):
@@ -476,10 +445,3 @@ class ConstrainedDelaunayAdjacencyTriangle(Triangle):
             return 0
         elif self.__lt__(other):
             return -1
-
-class ConstrainedDelaunayAdjacencyHoleTriangle(ConstrainedDelaunayAdjacencyTriangle):
-    __slots__ = ()
-
-    def __init__(self, vindex0, vindex1, vindex2, vertexData, geomTriangles, rewriter):
-        super(ConstrainedDelaunayAdjacencyHoleTriangle, self).__init__(vindex0, vindex1, vindex2,
-                                                                       vertexData, geomTriangles, rewriter)
\ No newline at end of file
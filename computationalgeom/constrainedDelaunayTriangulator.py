@@ -1,13 +1,15 @@
 #!/usr/bin/python
-import collections
+from array import array
 
 from direct.directnotify.DirectNotify import DirectNotify
 
 from panda3d.core import Geom, GeomNode
 from panda3d.core import GeomVertexData, GeomVertexFormat, GeomTriangles, GeomVertexReader, GeomVertexRewriter
-from panda3d.core import Point3
-from computationalgeom.constrainedDelaunayTriangle import ConstrainedDelaunayAdjacencyTriangle, ConstrainedDelaunayAdjacencyHoleTriangle
-from utils import getIntersectionBetweenPoints, getCenterOfPoints3D
+from panda3d.core import InternalName, Point3
+from computationalgeom.constrainedDelaunayTriangle import ConstrainedDelaunayAdjacencyTriangle
+from computationalgeom.cornerTable import CornerTable
+from predicates import orient2d
+from utils import getIntersectionBetweenPoints, getCenterOfPoints3D, getHilbertOrder, getBrioOrder
 from utilities.maxHeap import MaxHeap
 
 
@@ -59,22 +61,50 @@ class ConstrainedDelaunayTriangulator(object):
 
     @staticmethod
     def findContainingTriangle(point, startTriangle, fullList):
-        triangles = collections.deque([])
-        triangles.append(startTriangle)
-        while triangles:
-            tri = triangles.popleft()
+        """Walks from startTriangle toward the point, stepping across any edge that has the point on its far side.
+        Falls back to testing every triangle if the walk leaves the mesh or takes more steps than there are
+        triangles, which can only happen if the neighbor links are off."""
+        tri = startTriangle
+        cameFrom = None
+        for _ in range(0, len(fullList)):
+            # triangles are counterclockwise, so the inside is left of each edge
+            x0, y0, x1, y1, x2, y2 = tri.getCornerCoords()
+            nayb0, nayb1, nayb2 = tri.getNeighbors()
+            nextTri = None
+            for startX, startY, endX, endY, nayb in ((x0, y0, x1, y1, nayb0),
+                                                     (x1, y1, x2, y2, nayb1),
+                                                     (x2, y2, x0, y0, nayb2)):
+                if nayb == cameFrom and nayb is not None:
+                    continue  # the point was on this side of that edge when we crossed it
+                if orient2d(startX, startY, endX, endY, point.x, point.y) < 0:
+                    nextTri = nayb
+                    break
+            else:
+                return tri
+            if nextTri is None:
+                break
+            cameFrom = tri.index
+            tri = fullList[nextTri]
+
+        for tri in fullList:
             if tri.containsPoint(point):
                 return tri
-            triangles.extend([fullList[i] for i in tri.getNeighbors(includeEmpties=False)])
         raise ValueError("Point added that's outside of the bounded space {0}".format(point))
 
     def __init__(self, vertexName='ConstrainedDelaunayTriangles', vertexFormat=GeomVertexFormat.getV3(),
                   usage = Geom.UHDynamic, onVertexCreationCallback = None, universalZ = 0.0):
         self._vertexData = GeomVertexData(vertexName, vertexFormat, Geom.UHDynamic)
+        self._usage = usage
         self._geomTriangles = GeomTriangles(usage)
         self._geomTrianglesHoles = GeomTriangles(usage)
         self._vertexRewriter = GeomVertexRewriter(self._vertexData, 'vertex')  # user cannot have control of a writer
+        # x, y, z of every vertex, so triangles can read their points without going through the rewriter.
+        # All vertices are written through _addVertex or addVertices, which keep this in step with the vertex column
+        # and store the same float32 values it does.
+        self._coords = array('d')
 
+        # addVertices only calls back once per vertex if there's a callback to call
+        self._hasVertexCallback = onVertexCreationCallback is not None
         if onVertexCreationCallback is None:
             onVertexCreationCallback = lambda x, y, z: None  # something to call without checking existence later
         self._vertexCallback = onVertexCreationCallback
@@ -91,6 +121,7 @@ class ConstrainedDelaunayTriangulator(object):
             'maxY': negInf,
         }
         self.lastStaticVertexIndex = -1
+        self._constrainedEdges = set()  # (low vertex index, high vertex index) of the polygon and hole edges
 
     def addHoleVertex(self, index):
         """Adds the next consecutive vertex of the current hole."""
@@ -102,6 +133,8 @@ class ConstrainedDelaunayTriangulator(object):
         self.__polygon.append(index)
 
     def _addVertex(self, x, y, z, bounded=True):
+        # round to the float32 the vertex column holds, so _coords matches it and addVertices' vertices
+        x, y, z = array('f', (x, y, self._universalZ))
         # BLOG track bounds to create the encapsulating triangle rather than lexicographic ordering
         # BLOG could have used a heap while adding verts, then popped as we processed each vertex
         if x < self.bounds['minX'] and bounded:
@@ -116,8 +149,9 @@ class ConstrainedDelaunayTriangulator(object):
         if not self._vertexRewriter.isAtEnd():
             self._vertexRewriter.setRow(self._vertexData.getNumRows())
         n = self._vertexRewriter.getWriteRow()
-        self._vertexRewriter.addData3f(x, y, self._universalZ)
-        self._vertexCallback(x, y, self._universalZ)
+        self._vertexRewriter.addData3f(x, y, z)
+        self._coords.extend((x, y, z))
+        self._vertexCallback(x, y, z)
 
         return n
 
@@ -127,6 +161,83 @@ class ConstrainedDelaunayTriangulator(object):
             return self._addVertex(pointOrX.x, pointOrX.y, pointOrX.z, bounded=bounded)
         return self._addVertex(pointOrX, y, z, bounded=bounded)
 
+    def addVertices(self, buffer, bounded=True):
+        """Adds x, y, z triples from a contiguous float buffer, like an array('f') or a NumPy array, to the vertex
+        pool all at once. Returns the range of the new vertices' indices. Like addVertex, z is set to universalZ."""
+        floats = self._getFloatArray(buffer)
+        if len(floats) % 3 != 0:
+            raise ValueError("addVertices() needs x, y, z triples, but got {0} floats".format(len(floats)))
+        numNew = len(floats) // 3
+        if numNew == 0:
+            return range(0, 0)
+        floats[2::3] = array('f', [self._universalZ]) * numNew
+        xs = floats[0::3]
+        ys = floats[1::3]
+        if bounded:
+            self.bounds['minX'] = min(self.bounds['minX'], min(xs))
+            self.bounds['maxX'] = max(self.bounds['maxX'], max(xs))
+            self.bounds['minY'] = min(self.bounds['minY'], min(ys))
+            self.bounds['maxY'] = max(self.bounds['maxY'], max(ys))
+
+        start = self._vertexData.getNumRows()
+        self._vertexData.setNumRows(start + numNew)  # reserve the rows once
+        vertexArray = self._getPackedVertexArray()
+        if vertexArray is not None:
+            stride = 3 * floats.itemsize
+            handle = self._vertexData.modifyArray(vertexArray).modifyHandle()
+            handle.setSubdata(start * stride, numNew * stride, floats.tostring())
+            del handle  # let go of the array before the rewriter takes hold of it
+        # resizing and writing the array can copy it on write, which would leave the old rewriter on the old copy,
+        # so the rows are written and later vertices added through a new one
+        self._vertexRewriter = GeomVertexRewriter(self._vertexData, 'vertex')
+        if vertexArray is None:  # the vertex column is interleaved with others, so write it row by row
+            self._vertexRewriter.setRow(start)
+            for i in range(0, len(floats), 3):
+                self._vertexRewriter.setData3f(floats[i], floats[i + 1], floats[i + 2])
+        else:
+            self._vertexRewriter.setRow(start + numNew)
+        self._coords.extend(array('d', floats))
+
+        if self._hasVertexCallback:
+            for i in range(0, len(floats), 3):
+                self._vertexCallback(floats[i], floats[i + 1], floats[i + 2])
+        return range(start, start + numNew)
+
+    def addVerticesToPolygon(self, buffer, bounded=True):
+        """Adds the vertices of a float buffer to the pool (see addVertices) and then adds their indices to the
+        polygon vertex index list, in order."""
+        indices = self.addVertices(buffer, bounded=bounded)
+        self.__polygon.extend(indices)
+        return indices
+
+    def addVerticesToHole(self, buffer):
+        """Adds the vertices of a float buffer to the pool (see addVertices) and then adds their indices to the
+        current hole, in order."""
+        indices = self.addVertices(buffer)
+        self.__holes[-1].extend(indices)
+        return indices
+
+    @staticmethod
+    def _getFloatArray(buffer):
+        """Returns the buffer's floats as a new array('f')."""
+        if hasattr(buffer, 'astype'):  # a NumPy array, copied as one block rather than float by float
+            floats = array('f')
+            floats.fromstring(buffer.astype('float32').tostring())
+            return floats
+        return array('f', buffer)
+
+    def _getPackedVertexArray(self):
+        """Returns the index of the vertex data array holding the vertex column, if that array holds nothing but
+        x, y, z float32 triples, else None."""
+        vertexFormat = self._vertexData.getFormat()
+        vertexArray = vertexFormat.getArrayWith(InternalName.getVertex())
+        column = vertexFormat.getColumn(InternalName.getVertex())
+        if column.getNumComponents() != 3 or column.getNumericType() != Geom.NTFloat32 or column.getStart() != 0:
+            return None
+        if vertexFormat.getArray(vertexArray).getStride() != 12:
+            return None
+        return vertexArray
+
     def addVertexToPolygon(self, pointOrX, y, z, bounded=True):
         """Adds a vertex to the pool and then adds its index to the polygon vertex index list."""
         n = self.addVertex(pointOrX, y, z, bounded=bounded)
@@ -156,6 +267,16 @@ class ConstrainedDelaunayTriangulator(object):
         """Returns a list of triangles, each referencing its own neighbors by their list index."""
         return self.__polygon
 
+    def getCornerTable(self):
+        """Returns the triangulation as a CornerTable that shares this triangulator's vertex coordinates."""
+        if not self.isTriangulated():
+            raise LookupError("Must call triangulate() before asking for the corner table.")
+        table = CornerTable.fromTriangles(self.__polygon, self.getNumVertices(), coords=self._coords)
+        for c in range(0, len(table.V)):
+            if self.isConstrainedEdge(table.V[table.next(c)], table.V[table.prev(c)]):
+                table.constrained[c] = 1
+        return table
+
     def getGeomNode(self, name='ConstrainedDelaunayTriangles'):
         """returns a GeomNode, with the provided name, sufficient to put in the scene and draw."""
         # BLOG My TODO legend
@@ -228,6 +349,18 @@ class ConstrainedDelaunayTriangulator(object):
             verts.append(self._vertexRewriter.getData3f())
         return verts
     
+    def _orderPolygonVertices(self, ordering):
+        """Reorders the polygon's vertex indices so popping them off the end inserts them in the given order."""
+        xs = [self._coords[3 * ind] for ind in self.__polygon]
+        ys = [self._coords[3 * ind + 1] for ind in self.__polygon]
+        if ordering == 'hilbert':
+            order = getHilbertOrder(xs, ys)
+        elif ordering == 'brio':
+            order = getBrioOrder(xs, ys)
+        else:
+            raise ValueError("Unknown insertion ordering {0}. Use None, 'hilbert' or 'brio'.".format(ordering))
+        self.__polygon = [self.__polygon[i] for i in reversed(order)]
+
     def isLeftWinding(self):
         """Returns true if the polygon vertices are listed in counterclockwise order,
         or false if they appear to be listed in clockwise order."""
@@ -238,13 +371,22 @@ class ConstrainedDelaunayTriangulator(object):
         """Guesses whether the polygon has been triangulated."""
         return len(self.__polygon) > 0 and isinstance(self.__polygon[0], ConstrainedDelaunayAdjacencyTriangle)
     
-    def triangulate(self, makeDelaunay=True):
-        """Does the work of triangulating the specified polygon."""
+    def triangulate(self, makeDelaunay=True, ordering=None, constrain=False):
+        """Does the work of triangulating the specified polygon.
+        ordering=None inserts the points as they were added. 'hilbert' inserts them along a Hilbert curve, and 'brio'
+        does so in rounds of doubling size, so each point tends to land near the triangles made by the last one.
+        constrain=True inserts the holes' vertices too, makes the edges of the polygon and its holes into triangle
+        edges, then removes the triangles outside the polygon or inside a hole, which gives a CDT that can be searched
+        directly. It isn't the default, because that output is no longer Delaunay across the constrained edges.
+        constrain=False leaves the Delaunay triangulation of the polygon's points, including the triangles of the
+        bounding triangle's vertices."""
         global notify
         if self.isTriangulated():
             raise ValueError("triangulate() must only be called once.")
-        notify.warning("bounds: minX, minY, maxX, maxY {0} {1} {2} {3}".format(self.bounds['minX'], self.bounds['minY'],
-                                                                               self.bounds['maxX'], self.bounds['maxY']))
+        debug = notify.getDebug()
+        if debug:
+            notify.debug("bounds: minX, minY, maxX, maxY {0} {1} {2} {3}".format(self.bounds['minX'], self.bounds['minY'],
+                                                                             self.bounds['maxX'], self.bounds['maxY']))
         h = abs(self.bounds['maxY'] - self.bounds['minY'])
         w = abs(self.bounds['maxX'] - self.bounds['minX'])
         topLeft = Point3(self.bounds['minX'] - 10*w,
@@ -261,20 +403,29 @@ class ConstrainedDelaunayTriangulator(object):
         v1 = self.addVertex(bottomRight, bounded=False)
         v2 = self.addVertex(farRight, bounded=False)
         bounds = ConstrainedDelaunayAdjacencyTriangle(v0, v1, v2,
-                                                      self._vertexData, self._geomTriangles, self._vertexRewriter)
+                                                      self._vertexData, self._geomTriangles, self._vertexRewriter,
+                                                      coords=self._coords)
         triangulated = [bounds]
-
+        # the rings are needed after the points are popped. Hole vertices are inserted like any other point.
+        rings = [list(self.__polygon)] + [list(hole) for hole in self.__holes if hole]
+        if constrain:
+            for hole in self.__holes:
+                self.__polygon.extend(hole)
+        if ordering is not None:
+            self._orderPolygonVertices(ordering)
+
+        dirtyEdges = bytearray()  # shared by every legalize() call, which leaves it all clear
         while True:
             try:
                 pt = self.__polygon.pop()
             except IndexError:
                 break
-            self._vertexRewriter.setRow(pt)
-            point = self._vertexRewriter.getData3f()
-            notify.warning("\n######################## len {} TRIANGULATE {} ###########################\n".format(len(triangulated), point))
-            notify.warning("\n########################## SO FAR\n{}\n############################\n".format([tr.index for tr in triangulated]))
+            point = Point3(self._coords[3 * pt], self._coords[3 * pt + 1], self._coords[3 * pt + 2])
+            if debug:
+                notify.debug("\n######################## len {} TRIANGULATE {} ###########################\n".format(len(triangulated), point))
+                notify.debug("\n########################## SO FAR\n{}\n############################\n".format([tr.index for tr in triangulated]))
             # find the triangle the point lays within
-            found = ConstrainedDelaunayTriangulator.findContainingTriangle(point, bounds, triangulated)
+            found = ConstrainedDelaunayTriangulator.findContainingTriangle(point, triangulated[-1], triangulated)
             if found is not None:
                 # BLOG heapq.merge() is useless as it returns an iterable which can't be indexed, but heaps require lists
                 # BLOG Hence, it's probably faster to heap.push than to iterate (in C) a merge then iterate to recreate a list
@@ -282,13 +433,66 @@ class ConstrainedDelaunayTriangulator(object):
                 # triangulate the point into the triangle, collecting any new triangles
                 newTriangles = found.triangulatePoint(pt, triangulated)
                 triangulated.extend(newTriangles)
-                if makeDelaunay:
-                    for tri in newTriangles:
-                        tri.legalize(tri.point0, triangulated)  # point, triangulated)
-                        tri.legalize(tri.point1, triangulated)
-                        tri.legalize(tri.point2, triangulated)
+                if makeDelaunay and newTriangles:
+                    # found was split too, so it has the new point
+                    found.legalize(pt, triangulated, dirtyEdges)
             else:
                 raise ValueError("Point given that's outside of original space.")
-        notify.warning("triangulated: length: {} type: {}".format(len(triangulated), type(triangulated)))
+        if constrain:
+            triangulated = self._constrain(triangulated, rings, (v0, v1, v2), makeDelaunay)
+        if debug:
+            notify.debug("triangulated: length: {} type: {}".format(len(triangulated), type(triangulated)))
         self.__polygon = triangulated
 
+    def _constrain(self, triangulated, rings, boundsVertices, makeDelaunay):
+        """Recovers the edges of the rings, then keeps only the triangles inside the polygon and outside the holes.
+        The kept triangles are renumbered in order and moved to a new GeomTriangles. Returns them as a new list."""
+        table = CornerTable.fromTriangles(triangulated, self.getNumVertices(), coords=self._coords)
+        numConstraints = 0
+        for ring in rings:
+            if len(ring) < 3:
+                continue  # not a polygon, so there's no inside to keep
+            for i in range(0, len(ring)):
+                if ring[i - 1] != ring[i]:
+                    table.insertConstraint(ring[i - 1], ring[i], makeDelaunay=makeDelaunay)
+                    numConstraints += 1
+        if numConstraints == 0:
+            return triangulated
+
+        # the triangles at the bounding vertices are outside. Crossing an odd number of constraints means inside.
+        outer = set()
+        for vertex in boundsVertices:
+            outer.update(c // 3 for c in table.getCornersAroundVertex(vertex))
+        depths = table.getConstraintDepths(outer)
+        newIndices = array('i', [-1]) * len(table)
+        kept = []
+        for tri in range(0, len(table)):
+            if depths[tri] % 2 == 1:
+                newIndices[tri] = len(kept)
+                kept.append(tri)
+
+        geomTriangles = GeomTriangles(self._usage)
+        trimmed = []
+        for tri in kept:
+            geomTriangles.addVertices(*table.getTriangleVertices(tri))
+        for tri in kept:
+            triangle = triangulated[tri]
+            triangle.setPrimitives(geomTriangles, newIndices[tri])
+            for edge, nayb in enumerate(table.getNeighbors(tri)):
+                if nayb is not None and newIndices[nayb] != -1:
+                    triangle.setNeighbor(edge, newIndices[nayb])
+                else:
+                    triangle.setNeighbor(edge, None)
+            trimmed.append(triangle)
+            for c in (3 * tri, 3 * tri + 1, 3 * tri + 2):
+                if table.isConstrained(c):
+                    v1 = table.V[table.next(c)]
+                    v2 = table.V[table.prev(c)]
+                    self._constrainedEdges.add((v1, v2) if v1 < v2 else (v2, v1))
+        self._geomTriangles = geomTriangles
+        return trimmed
+
+    def isConstrainedEdge(self, ind1, ind2):
+        """Returns True if the edge between the two vertex indices is an edge of the polygon or one of its holes."""
+        return ((ind1, ind2) if ind1 < ind2 else (ind2, ind1)) in self._constrainedEdges
+
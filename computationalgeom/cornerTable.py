@@ -0,0 +1,476 @@
+#!/usr/bin/python
+from array import array
+from collections import deque
+
+from direct.directnotify.DirectNotify import DirectNotify
+
+from predicates import orient2d, incircle
+
+notify = DirectNotify().newCategory("CornerTable")
+
+
+class CornerTable(object):
+    """
+    A triangle mesh stored as a corner table. Corner c is vertex c % 3 of triangle c // 3, and the corners of a
+    triangle go counterclockwise. V[c] is the vertex index at corner c. O[c] is the corner across the edge facing c,
+    in the neighboring triangle, or -1 on the boundary. vertexCorners[v] is one corner at vertex v, and constrained[c]
+    flags the edge facing c as one that must not be flipped. coords optionally holds x, y, z per vertex.
+    Edge k of a triangle runs from its vertex k to vertex k + 1, the same as Triangle.edge0..edge2.
+    """
+    __slots__ = ('V', 'O', 'vertexCorners', 'constrained', 'coords')
+
+    @staticmethod
+    def next(c):
+        return c - 2 if c % 3 == 2 else c + 1
+
+    @staticmethod
+    def prev(c):
+        return c + 2 if c % 3 == 0 else c - 1
+
+    @staticmethod
+    def triangle(c):
+        return c // 3
+
+    @classmethod
+    def fromTriangles(cls, triangles, numVertices, coords=None):
+        """Builds a table from Triangles, such as ConstrainedDelaunayTriangulator.getTriangleList(). The triangles must
+        be indexed by their position in the list."""
+        table = cls(numVertices, coords)
+        for tri in triangles:
+            table.addTriangle(*tri.getPointIndices())
+        table.linkOpposites()
+        return table
+
+    @classmethod
+    def fromAdjacencyList(cls, adjLst):
+        """Builds a table, with coords, from the legacy PolygonUtils.AdjacencyList.AdjLstElement list. Equal points
+        become one vertex, and each triangle keeps its index but is put in counterclockwise order."""
+        coords = array('d')
+        vertices = dict()  # (x, y, z): vertex index
+        table = cls(0, coords)
+        for el in adjLst:
+            inds = []
+            for pt in el.tri:
+                key = (pt.x, pt.y, pt.z)
+                if key not in vertices:
+                    vertices[key] = len(vertices)
+                    coords.extend(key)
+                inds.append(vertices[key])
+            pt0, pt1, pt2 = el.tri
+            if (pt1.x - pt0.x) * (pt2.y - pt0.y) - (pt1.y - pt0.y) * (pt2.x - pt0.x) < 0:
+                inds[1], inds[2] = inds[2], inds[1]
+            table.addTriangle(*inds)
+        table.linkOpposites()
+        return table
+
+    def __init__(self, numVertices=0, coords=None):
+        self.V = array('i')
+        self.O = array('i')
+        self.vertexCorners = array('i', [-1]) * numVertices
+        self.constrained = bytearray()
+        self.coords = coords
+
+    def __len__(self):
+        return len(self.V) // 3
+
+    def addTriangle(self, v0, v1, v2):
+        """Adds a triangle with no neighbors and returns its index. The vertices must be counterclockwise."""
+        c = len(self.V)
+        self.V.extend((v0, v1, v2))
+        self.O.extend((-1, -1, -1))
+        self.constrained.extend(b'\0\0\0')
+        top = max(v0, v1, v2)
+        if top >= len(self.vertexCorners):
+            self.vertexCorners.extend([-1] * (top + 1 - len(self.vertexCorners)))
+        self.vertexCorners[v0] = c
+        self.vertexCorners[v1] = c + 1
+        self.vertexCorners[v2] = c + 2
+        return c // 3
+
+    def linkOpposites(self):
+        """Sets every O from V in one pass, by matching the two corners that face each edge."""
+        V = self.V
+        O = self.O
+        openEdges = dict()  # (low vertex, high vertex): corner facing the edge, until the other side claims it
+        for c in range(0, len(V)):
+            v1 = V[self.next(c)]
+            v2 = V[self.prev(c)]
+            key = (v1, v2) if v1 < v2 else (v2, v1)
+            other = openEdges.pop(key, None)
+            if other is None:
+                openEdges[key] = c
+                O[c] = -1
+            else:
+                O[c] = other
+                O[other] = c
+
+    def setOpposites(self, c1, c2):
+        """Links corners c1 and c2 across the edge they both face. Either may be -1 for the boundary."""
+        if c1 != -1:
+            self.O[c1] = c2
+        if c2 != -1:
+            self.O[c2] = c1
+
+    def getCorner(self, tri, vertex):
+        """Returns the corner of the triangle at the vertex index."""
+        c = 3 * tri
+        if self.V[c] == vertex:
+            return c
+        if self.V[c + 1] == vertex:
+            return c + 1
+        if self.V[c + 2] == vertex:
+            return c + 2
+        raise LookupError("Vertex {0} isn't in triangle {1}".format(vertex, tri))
+
+    def getCornersAroundVertex(self, vertex):
+        """Returns the corners at the vertex, in counterclockwise order around it."""
+        start = self.vertexCorners[vertex]
+        if start == -1:
+            return []
+        corners = [start]
+        c = start
+        while True:
+            o = self.O[self.next(c)]
+            if o == -1:
+                break
+            c = self.next(o)
+            if c == start:
+                return corners
+            corners.append(c)
+        # we hit the boundary, so also turn the other way from the start
+        c = start
+        while True:
+            o = self.O[self.prev(c)]
+            if o == -1:
+                break
+            c = self.prev(o)
+            corners.insert(0, c)
+        return corners
+
+    def findEdgeCorner(self, ind1, ind2):
+        """Returns a corner facing the edge between the two vertices, or -1 if there's no such edge."""
+        V = self.V
+        for c in self.getCornersAroundVertex(ind1):
+            if V[self.next(c)] == ind2:
+                return self.prev(c)
+            if V[self.prev(c)] == ind2:
+                return self.next(c)
+        return -1
+
+    def getConstraintDepths(self, outerTriangles):
+        """Returns, for each triangle, the fewest constrained edges crossed to reach it from any of outerTriangles,
+        or -1 if it can't be reached. Inside a polygon is odd, and outside it or inside a hole is even."""
+        depths = array('i', [-1]) * len(self)
+        queue = deque()
+        for tri in outerTriangles:
+            depths[tri] = 0
+            queue.append(tri)
+        O = self.O
+        while queue:
+            tri = queue.popleft()
+            depth = depths[tri]
+            for c in (3 * tri, 3 * tri + 1, 3 * tri + 2):
+                o = O[c]
+                if o == -1:
+                    continue
+                nayb = o // 3
+                if self.constrained[c]:
+                    if depths[nayb] == -1 or depths[nayb] > depth + 1:
+                        depths[nayb] = depth + 1
+                        queue.append(nayb)
+                elif depths[nayb] == -1 or depths[nayb] > depth:
+                    depths[nayb] = depth
+                    queue.appendleft(nayb)  # same depth, so it goes before the deeper triangles
+        return depths
+
+    def getOrientation(self, ind0, ind1, ind2):
+        """Returns a positive number if the three vertices turn counterclockwise, a negative one if they turn
+        clockwise, or 0 if they're collinear (see predicates.orient2d)."""
+        coords = self.coords
+        i0 = 3 * ind0
+        i1 = 3 * ind1
+        i2 = 3 * ind2
+        return orient2d(coords[i0], coords[i0 + 1], coords[i1], coords[i1 + 1], coords[i2], coords[i2 + 1])
+
+    def getEdgeCorner(self, tri, edge):
+        """Returns the corner that faces edge 0, 1 or 2 of the triangle."""
+        return 3 * tri + (edge + 2) % 3
+
+    def getNeighbor(self, tri, edge):
+        """Returns the triangle across edge 0, 1 or 2, or None on the boundary."""
+        o = self.O[3 * tri + (edge + 2) % 3]
+        if o == -1:
+            return None
+        return o // 3
+
+    def getNeighbors(self, tri):
+        """Returns the triangles across edges 0, 1 and 2, with None on the boundary."""
+        c = 3 * tri
+        O = self.O
+        return (O[c + 2] // 3 if O[c + 2] != -1 else None,
+                O[c] // 3 if O[c] != -1 else None,
+                O[c + 1] // 3 if O[c + 1] != -1 else None)
+
+    def getTriangleVertices(self, tri):
+        c = 3 * tri
+        return self.V[c], self.V[c + 1], self.V[c + 2]
+
+    def getVertexCoords(self, vertex):
+        i = 3 * vertex
+        return self.coords[i], self.coords[i + 1], self.coords[i + 2]
+
+    def isConstrained(self, c):
+        return self.constrained[c] == 1
+
+    def setConstrained(self, c, constrained=True):
+        """Flags the edge facing corner c, from both sides."""
+        self.constrained[c] = 1 if constrained else 0
+        o = self.O[c]
+        if o != -1:
+            self.constrained[o] = self.constrained[c]
+
+    def flip(self, c):
+        """
+        Replaces the edge facing corner c with the other diagonal of the quad made by the two triangles either side.
+        The triangles keep their indices, and the corners at c and its opposite keep their vertices.
+        """
+        V = self.V
+        O = self.O
+        o = O[c]
+        if o == -1:
+            raise ValueError("Can't flip the boundary edge facing corner {0}".format(c))
+        cn = self.next(c)
+        cp = self.prev(c)
+        on = self.next(o)
+        op = self.prev(o)
+        # the quad is a, b, e, d counterclockwise, and a-e becomes the diagonal in place of b-d
+        a = V[c]
+        e = V[o]
+        outerN = O[on]
+        outerCn = O[cn]
+        constrainedOn = self.constrained[on]
+        constrainedCn = self.constrained[cn]
+        V[cp] = e  # a, b, e
+        V[op] = a  # e, d, a
+        self.setOpposites(c, outerN)
+        self.setOpposites(o, outerCn)
+        self.setOpposites(cn, on)
+        self.constrained[c] = constrainedOn
+        self.constrained[o] = constrainedCn
+        self.constrained[cn] = 0
+        self.constrained[on] = 0
+        self.vertexCorners[V[cn]] = cn  # b lost its corner at op
+        self.vertexCorners[V[on]] = on  # d lost its corner at cp
+
+    def isInCircumcircle(self, c):
+        """Returns True if the vertex across the edge facing corner c is strictly inside the circumcircle of c's
+        triangle."""
+        coords = self.coords
+        i0 = 3 * self.V[c]
+        i1 = 3 * self.V[self.next(c)]
+        i2 = 3 * self.V[self.prev(c)]
+        i3 = 3 * self.V[self.O[c]]
+        return incircle(coords[i0], coords[i0 + 1], coords[i1], coords[i1 + 1], coords[i2], coords[i2 + 1],
+                        coords[i3], coords[i3 + 1]) > 0
+
+    def _isCrossing(self, ind1, ind2, segStart, segEnd):
+        """Returns True if the edge between ind1 and ind2 crosses the segment through both their interiors."""
+        if ind1 in (segStart, segEnd) or ind2 in (segStart, segEnd):
+            return False
+        side1 = self.getOrientation(segStart, segEnd, ind1)
+        side2 = self.getOrientation(segStart, segEnd, ind2)
+        if not (side1 > 0 > side2 or side1 < 0 < side2):
+            return False
+        side1 = self.getOrientation(ind1, ind2, segStart)
+        side2 = self.getOrientation(ind1, ind2, segEnd)
+        return side1 > 0 > side2 or side1 < 0 < side2
+
+    def _isBetween(self, ind, segStart, segEnd):
+        """Returns True if the vertex, which must be on the line through the segment, is inside the segment."""
+        coords = self.coords
+        i = 3 * ind
+        s = 3 * segStart
+        e = 3 * segEnd
+        dot = (coords[i] - coords[s]) * (coords[e] - coords[s]) + (coords[i + 1] - coords[s + 1]) * (coords[e + 1] - coords[s + 1])
+        lenSq = (coords[e] - coords[s]) ** 2 + (coords[e + 1] - coords[s + 1]) ** 2
+        return 0 < dot < lenSq
+
+    def _getCrossingEdges(self, segStart, segEnd):
+        """
+        Walks from segStart toward segEnd and returns ([(ind1, ind2)] edges crossing the segment, None), or
+        (None, vertex) if the segment runs through another vertex first, or ([], None) if the edge already exists.
+        """
+        V = self.V
+        O = self.O
+        start = -1
+        for c in self.getCornersAroundVertex(segStart):
+            nextV = V[self.next(c)]
+            prevV = V[self.prev(c)]
+            if segEnd in (nextV, prevV):
+                return [], None
+            toNext = self.getOrientation(segStart, nextV, segEnd)
+            toPrev = self.getOrientation(segStart, prevV, segEnd)
+            if toNext == 0 and self._isBetween(nextV, segStart, segEnd):
+                return None, nextV
+            if toPrev == 0 and self._isBetween(prevV, segStart, segEnd):
+                return None, prevV
+            if toNext > 0 > toPrev:
+                start = c
+                break
+        if start == -1:
+            raise ValueError("Can't find the way from vertex {0} toward vertex {1}".format(segStart, segEnd))
+
+        crossing = []
+        c = start
+        while True:
+            if self.constrained[c]:
+                raise ValueError("The constraint from vertex {0} to {1} crosses another constraint".format(segStart,
+                                                                                                          segEnd))
+            crossing.append((V[self.next(c)], V[self.prev(c)]))
+            o = O[c]
+            if o == -1:
+                raise ValueError("The constraint from vertex {0} to {1} leaves the mesh".format(segStart, segEnd))
+            opposite = V[o]
+            if opposite == segEnd:
+                return crossing, None
+            side = self.getOrientation(segStart, segEnd, opposite)
+            if side == 0:
+                return None, opposite
+            # leave through whichever of the other two edges has its ends on both sides of the segment
+            if (self.getOrientation(segStart, segEnd, V[self.next(o)]) > 0) != (side > 0):
+                c = self.prev(o)
+            else:
+                c = self.next(o)
+
+    def insertConstraint(self, segStart, segEnd, makeDelaunay=True):
+        """
+        Makes the segment between the two vertices an edge, or a chain of edges if it runs through other vertices,
+        and flags them as constrained. Edges crossing the segment are flipped away until none are left. If
+        makeDelaunay, the edges made by those flips are then flipped until they are Delaunay again.
+        """
+        crossing, through = self._getCrossingEdges(segStart, segEnd)
+        if through is not None:
+            self.insertConstraint(segStart, through, makeDelaunay)
+            self.insertConstraint(through, segEnd, makeDelaunay)
+            return
+
+        V = self.V
+        crossing = deque(crossing)
+        newEdges = []
+        sinceFlip = 0
+        while crossing:
+            ind1, ind2 = crossing.popleft()
+            c = self.findEdgeCorner(ind1, ind2)
+            apex = V[c]
+            opposite = V[self.O[c]]
+            # only a convex quad can be flipped. Otherwise, come back to it after its neighbors have moved.
+            if (self.getOrientation(apex, V[self.next(c)], opposite) <= 0 or
+                    self.getOrientation(opposite, V[self.prev(c)], apex) <= 0):
+                crossing.append((ind1, ind2))
+                sinceFlip += 1
+                if sinceFlip > len(crossing):
+                    raise ValueError("Can't flip the edges crossing the constraint from vertex {0} to {1}".format(
+                        segStart, segEnd))
+                continue
+            sinceFlip = 0
+            self.flip(c)
+            if self._isCrossing(apex, opposite, segStart, segEnd):
+                crossing.append((apex, opposite))
+            else:
+                newEdges.append((apex, opposite))
+
+        c = self.findEdgeCorner(segStart, segEnd)
+        self.setConstrained(c)
+        if notify.getDebug():
+            notify.debug("insertConstraint {0}-{1} made {2} edges".format(segStart, segEnd, len(newEdges)))
+        if not makeDelaunay:
+            return
+
+        flipped = True
+        while flipped:
+            flipped = False
+            for i in range(0, len(newEdges)):
+                c = self.findEdgeCorner(*newEdges[i])
+                if c == -1 or self.constrained[c] or self.O[c] == -1:
+                    continue
+                if self.isInCircumcircle(c):
+                    opposite = V[self.O[c]]
+                    self.flip(c)
+                    newEdges[i] = (V[c], opposite)
+                    flipped = True
+
+    def splitEdge(self, c, vertex):
+        """
+        Splits the edge facing corner c at the vertex, which must already have coords and lie on the edge. The two
+        triangles on the edge become four, and both halves of the edge keep its constraint flag. Returns the
+        indices of the new triangles.
+        """
+        V = self.V
+        O = self.O
+        if vertex >= len(self.vertexCorners):
+            self.vertexCorners.extend([-1] * (vertex + 1 - len(self.vertexCorners)))
+        constrained = self.constrained[c]
+        o = O[c]
+        cn = self.next(c)
+        cp = self.prev(c)
+        apex = V[c]
+        edgeEnd = V[cp]
+        outerCn = O[cn]
+        constrainedCn = self.constrained[cn]
+        # (apex, n, p) becomes (apex, n, vertex) and the new (apex, vertex, p)
+        V[cp] = vertex
+        newTri = self.addTriangle(apex, vertex, edgeEnd)
+        nc = 3 * newTri
+        self.setOpposites(cn, nc + 2)
+        self.setOpposites(nc + 1, outerCn)
+        self.constrained[nc + 1] = constrainedCn
+        self.constrained[nc] = constrained
+        self.constrained[cn] = 0
+        self.vertexCorners[apex] = c
+        self.vertexCorners[V[cn]] = cn
+        self.vertexCorners[vertex] = cp
+        if o == -1:
+            O[c] = -1
+            O[nc] = -1
+            return [newTri]
+
+        on = self.next(o)
+        op = self.prev(o)
+        otherApex = V[o]
+        otherEnd = V[op]
+        outerOn = O[on]
+        constrainedOn = self.constrained[on]
+        # (otherApex, p, n) becomes (otherApex, p, vertex) and the new (otherApex, vertex, n)
+        V[op] = vertex
+        otherTri = self.addTriangle(otherApex, vertex, otherEnd)
+        oc = 3 * otherTri
+        self.setOpposites(on, oc + 2)
+        self.setOpposites(oc + 1, outerOn)
+        self.constrained[oc + 1] = constrainedOn
+        self.constrained[on] = 0
+        # the halves of the split edge: apex's half is vertex to n, which the other's new triangle has
+        self.setOpposites(c, oc)
+        self.setOpposites(o, nc)
+        self.constrained[oc] = constrained
+        self.constrained[o] = constrained
+        self.vertexCorners[otherApex] = o
+        self.vertexCorners[V[on]] = on
+        return [newTri, otherTri]
+
+    def legalizeVertex(self, vertex):
+        """Flips the unconstrained edges facing the vertex until they are all Delaunay. Returns the number of flips."""
+        V = self.V
+        O = self.O
+        stack = self.getCornersAroundVertex(vertex)
+        flips = 0
+        while stack:
+            c = stack.pop()
+            if V[c] != vertex or O[c] == -1 or self.constrained[c] or not self.isInCircumcircle(c):
+                continue
+            o = O[c]
+            self.flip(c)
+            flips += 1
+            # the vertex keeps corner c, and takes the corner before o in the other triangle
+            stack.append(c)
+            stack.append(self.prev(o))
+        return flips
@@ -0,0 +1,103 @@
+#!/usr/bin/python
+"""
+Orientation and incircle tests whose signs are always right.
+
+Each test first evaluates its determinant in floating point and compares it with an error bound on that
+evaluation (Shewchuk's stage A bounds for IEEE doubles). Only when the determinant is too close to zero to trust is it
+recomputed exactly with Fractions, which almost never happens outside of collinear or cocircular points.
+Only the sign of the results is meaningful.
+"""
+from fractions import Fraction
+
+_EPSILON = 2.0 ** -53  # half a unit in the last place of 1.0
+_CCW_ERROR_BOUND = (3.0 + 16.0 * _EPSILON) * _EPSILON
+_INCIRCLE_ERROR_BOUND = (10.0 + 96.0 * _EPSILON) * _EPSILON
+
+
+def _getSign(value):
+    if value > 0:
+        return 1.0
+    elif value < 0:
+        return -1.0
+    return 0.0
+
+
+def orient2d(ax, ay, bx, by, cx, cy):
+    """Returns a positive number if a, b, c turn counterclockwise, a negative one if they turn clockwise,
+    or 0 if they're collinear."""
+    detLeft = (ax - cx) * (by - cy)
+    detRight = (ay - cy) * (bx - cx)
+    det = detLeft - detRight
+    # if the two products have opposite signs the subtraction can't cancel, so the sign of det is right
+    if detLeft > 0:
+        if detRight <= 0:
+            return det
+        detSum = detLeft + detRight
+    elif detLeft < 0:
+        if detRight >= 0:
+            return det
+        detSum = -detLeft - detRight
+    else:
+        return det
+    if abs(det) >= _CCW_ERROR_BOUND * detSum:
+        return det
+    return _orient2dExact(ax, ay, bx, by, cx, cy)
+
+
+def _orient2dExact(ax, ay, bx, by, cx, cy):
+    ax, ay, bx, by, cx, cy = [Fraction(v) for v in (ax, ay, bx, by, cx, cy)]
+    return _getSign((ax - cx) * (by - cy) - (ay - cy) * (bx - cx))
+
+
+def orient2dPoints(pt0, pt1, pt2):
+    """orient2d for three points with x and y."""
+    return orient2d(pt0.x, pt0.y, pt1.x, pt1.y, pt2.x, pt2.y)
+
+
+def incircle(ax, ay, bx, by, cx, cy, dx, dy):
+    """Returns a positive number if d is inside the circle through a, b, c, which must turn counterclockwise, a
+    negative one if it's outside, or 0 if it's on the circle."""
+    adx = ax - dx
+    ady = ay - dy
+    bdx = bx - dx
+    bdy = by - dy
+    cdx = cx - dx
+    cdy = cy - dy
+
+    bdxcdy = bdx * cdy
+    cdxbdy = cdx * bdy
+    aLift = adx * adx + ady * ady
+
+    cdxady = cdx * ady
+    adxcdy = adx * cdy
+    bLift = bdx * bdx + bdy * bdy
+
+    adxbdy = adx * bdy
+    bdxady = bdx * ady
+    cLift = cdx * cdx + cdy * cdy
+
+    det = aLift * (bdxcdy - cdxbdy) + bLift * (cdxady - adxcdy) + cLift * (adxbdy - bdxady)
+    permanent = ((abs(bdxcdy) + abs(cdxbdy)) * aLift +
+                 (abs(cdxady) + abs(adxcdy)) * bLift +
+                 (abs(adxbdy) + abs(bdxady)) * cLift)
+    if abs(det) > _INCIRCLE_ERROR_BOUND * permanent:
+        return det
+    return _incircleExact(ax, ay, bx, by, cx, cy, dx, dy)
+
+
+def _incircleExact(ax, ay, bx, by, cx, cy, dx, dy):
+    ax, ay, bx, by, cx, cy, dx, dy = [Fraction(v) for v in (ax, ay, bx, by, cx, cy, dx, dy)]
+    adx = ax - dx
+    ady = ay - dy
+    bdx = bx - dx
+    bdy = by - dy
+    cdx = cx - dx
+    cdy = cy - dy
+    return _getSign((adx * adx + ady * ady) * (bdx * cdy - cdx * bdy) +
+                    (bdx * bdx + bdy * bdy) * (cdx * ady - adx * cdy) +
+                    (cdx * cdx + cdy * cdy) * (adx * bdy - bdx * ady))
+
+
+def incirclePoints(pt0, pt1, pt2, pt3):
+    """incircle for four points with x and y."""
+    return incircle(pt0.x, pt0.y, pt1.x, pt1.y, pt2.x, pt2.y, pt3.x, pt3.y)
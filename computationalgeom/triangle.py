@@ -1,5 +1,6 @@
 #!/usr/bin/python
 from collections import namedtuple
+from array import array
 import struct, math
 
 from panda3d.core import Geom, GeomVertexData, GeomVertexFormat, GeomVertexReader, GeomVertexRewriter
@@ -9,16 +10,31 @@ from direct.directnotify.DirectNotify import DirectNotify
 
 
 from simpleCircle import SimpleCircle  # for the circumcircle
+from predicates import orient2d
 from utils import getIntersectionBetweenPoints, EPSILON
 
 notify = DirectNotify().newCategory("Trangle")
 
+# bits of Triangle.getSharedMask()
+SHARED_POINT0 = 1
+SHARED_POINT1 = 2
+SHARED_POINT2 = 4
+SHARED_EDGE0 = 8
+SHARED_EDGE1 = 16
+SHARED_EDGE2 = 32
+# the edges shared for each combination of shared point bits. edge0 is points 0-1, edge1 1-2 and edge2 2-0
+_SHARED_EDGES = (0, 0, 0, SHARED_EDGE0, 0, SHARED_EDGE2, SHARED_EDGE1, SHARED_EDGE0 | SHARED_EDGE1 | SHARED_EDGE2)
+
 
 class PrimitiveInterface(object):
     """Handles interfacing with GeomVertexData objects as well as GeomPrimitives"""
 
     @classmethod
     def readData3f(cls, ind, vreader):
+        """Reads a vertex from a GeomVertexReader, or from a flat x, y, z coordinate array mirroring the column."""
+        if isinstance(vreader, array):
+            i = 3 * ind
+            return vreader[i], vreader[i + 1], vreader[i + 2]
         vreader.setRow(ind)
         return vreader.getData3f()
 
@@ -28,6 +44,14 @@ class PrimitiveInterface(object):
         self.primitives = primitives
 
     def getTriangleAsPoints(self, ind, vreader=None):
+        if isinstance(vreader, array):
+            i0, i1, i2 = self.getTriangleVertexIndices(ind)
+            i0 *= 3
+            i1 *= 3
+            i2 *= 3
+            return Triangle.TriangleTuple(Point3(vreader[i0], vreader[i0 + 1], vreader[i0 + 2]),
+                                          Point3(vreader[i1], vreader[i1 + 1], vreader[i1 + 2]),
+                                          Point3(vreader[i2], vreader[i2 + 1], vreader[i2 + 2]))
         if vreader is None:
             vreader = GeomVertexReader(self.vdata, 'vertex')
         pts = []
@@ -65,18 +89,25 @@ class Triangle(object):
     """A triangle object to help with triangle related calculations."""
 
     TriangleTuple = namedtuple('TriangleTuple', 'point0 point1 point2')
+
+    class SharedNamedTuple(namedtuple('SharedNamedTuple', [
+            'numSharedPoints',
+            'point0', 'point1', 'point2',
+            'edge0', 'edge1', 'edge2',
+            'indicesNotShared',
+            'otherIndicesNotShared',
+            'other'
+    ])):
+        __slots__ = ()
     # keep Triangle ignorant of other triangles as much as possible
-    __slots__ = ('_selfIndex', '_primitiveInterface', '_rewriter')
+    __slots__ = ('_selfIndex', '_primitiveInterface', '_rewriter', '_coords')
 
     # TODO may implement descriptor for attribute access:
     # https://docs.python.org/2/reference/datamodel.html#implementing-descriptors
 
     @classmethod
     def getCcwOrder(cls, ind0, ind1, ind2, vreader):
-        pt0, pt1, pt2 = cls.makeDummy(ind0, ind1, ind2, vreader)
-        rightVec = pt1 - pt0
-        leftVec = pt2 - pt0
-        if rightVec.cross(leftVec).z <= 0:
+        if cls.getDummyOrientation(ind0, ind1, ind2, vreader) <= 0:
             tmp = ind1
             ind1 = ind2
             ind2 = tmp
@@ -86,6 +117,8 @@ class Triangle(object):
     @classmethod
     def getDummyMinAngleDeg(cls, ind0, ind1, ind2, vreader):
         ind0, ind1, ind2 = cls.getCcwOrder(ind0, ind1, ind2, vreader)  # ??? needs to be ccw
+        if cls.getDummyOrientation(ind0, ind1, ind2, vreader) == 0:
+            return 0.0  # collinear, which the exact test can tell apart from merely thin
         pt0, pt1, pt2 = cls.makeDummy(ind0, ind1, ind2, vreader)
         v0 = pt1 - pt0
         v1 = pt1 - pt2  # reverse of triangle eg cw winding
@@ -96,11 +129,16 @@ class Triangle(object):
         deg0 = v0.angleDeg(v2)
         deg1 = (-v2).angleDeg(v1)
         deg2 = (-v1).angleDeg(-v0)
-        if min(deg0, deg1, deg2) < EPSILON:
-            return 180.0  # virtually collinear (likely is collinear but is hidden by floating point error)
-        assert abs(deg0 + deg1 + deg2 - 180) < EPSILON
         return min(deg0, deg1, deg2)
 
+    @classmethod
+    def getDummyOrientation(cls, ind0, ind1, ind2, vreader):
+        """Returns orient2d of the three vertices, read straight from vreader rather than made into points."""
+        x0, y0, _ = PrimitiveInterface.readData3f(ind0, vreader)
+        x1, y1, _ = PrimitiveInterface.readData3f(ind1, vreader)
+        x2, y2, _ = PrimitiveInterface.readData3f(ind2, vreader)
+        return orient2d(x0, y0, x1, y1, x2, y2)
+
     @classmethod
     def makeDummy(cls, ind0, ind1, ind2, vreader):
         pt0 = Point3(*PrimitiveInterface.readData3f(ind0, vreader))
@@ -108,10 +146,14 @@ class Triangle(object):
         pt2 = Point3(*PrimitiveInterface.readData3f(ind2, vreader))
         return pt0, pt1, pt2
 
-    def __init__(self, vindex0, vindex1, vindex2, vertexData, geomTriangles, rewriter):
+    def __init__(self, vindex0, vindex1, vindex2, vertexData, geomTriangles, rewriter, coords=None):
+        """coords is an optional array('d') of x, y, z per vertex that mirrors the vertex column, holding the same
+        float32 values. When it's given,
+        the triangle reads its points from it rather than through the rewriter."""
         assert vindex0 not in (vindex1, vindex2) and vindex1 not in (vindex0, vindex2)  # prevent duplicate indices
         super(Triangle, self).__init__()
-        if Triangle.getDummyMinAngleDeg(vindex0, vindex1, vindex2, rewriter) <= 0:
+        vertexSource = rewriter if coords is None else coords
+        if Triangle.getDummyOrientation(vindex0, vindex1, vindex2, vertexSource) == 0:
             rewriter.setRow(vindex0)
             pt0 = rewriter.getData3f()
             rewriter.setRow(vindex1)
@@ -120,35 +162,44 @@ class Triangle(object):
             pt2 = rewriter.getData3f()
             raise ValueError("Collinear degenerate triangle points: {0} {1} {2}".format(pt0, pt1, pt2))
 
-        inds = Triangle.getCcwOrder(vindex0, vindex1, vindex2, rewriter)
+        inds = Triangle.getCcwOrder(vindex0, vindex1, vindex2, vertexSource)
         geomTriangles.addVertices(*inds)
 
         self._selfIndex = geomTriangles.getNumPrimitives() - 1
         self._primitiveInterface = PrimitiveInterface(vertexData, geomTriangles)
         self._rewriter = rewriter
+        self._coords = coords
+
+    def _getVertexSource(self):
+        return self._rewriter if self._coords is None else self._coords
 
     def asPointsEnum(self):
-        return self._primitiveInterface.getTriangleAsPoints(self._selfIndex, vreader=self._rewriter)
+        return self._primitiveInterface.getTriangleAsPoints(self._selfIndex, vreader=self._getVertexSource())
 
     def asIndexList(self):
         return self._primitiveInterface.getTriangleVertexIndices(self._selfIndex)
 
+    def getCornerCoords(self):
+        """Returns x0, y0, x1, y1, x2, y2 of the triangle's points, read straight from its vertex source so the
+        predicates see exactly the stored coordinates."""
+        source = self._getVertexSource()
+        ind0, ind1, ind2 = self._primitiveInterface.getTriangleVertexIndices(self._selfIndex)
+        x0, y0, _ = PrimitiveInterface.readData3f(ind0, source)
+        x1, y1, _ = PrimitiveInterface.readData3f(ind1, source)
+        x2, y2, _ = PrimitiveInterface.readData3f(ind2, source)
+        return x0, y0, x1, y1, x2, y2
+
     def containsPoint(self, point, includeEdges=True):
-        slf = self.asPointsEnum()
-        v1 = slf.point2 - slf.point0
-        pv1 = point - slf.point0
-        v2 = slf.point1 - slf.point2
-        pv2 = point - slf.point2
-        v3 = slf.point0 - slf.point1
-        pv3 = point - slf.point1
-        if not self.isLeftWinding():
-            v1 = -v1
-            v2 = -v2
-            v3 = -v3
+        x0, y0, x1, y1, x2, y2 = self.getCornerCoords()
+        sides = (orient2d(x0, y0, x1, y1, point.x, point.y),
+                 orient2d(x1, y1, x2, y2, point.x, point.y),
+                 orient2d(x2, y2, x0, y0, point.x, point.y))
+        if orient2d(x0, y0, x1, y1, x2, y2) < 0:
+            sides = [-side for side in sides]  # clockwise, so the inside is right of each edge
         if includeEdges:
-            return v1.cross(pv1).z <= 0 and v2.cross(pv2).z <= 0 and v3.cross(pv3).z <= 0
+            return min(sides) >= 0
         else:
-            return v1.cross(pv1).z < 0 and v2.cross(pv2).z < 0 and v3.cross(pv3).z < 0
+            return min(sides) > 0
 
     @property
     def edge0(self):
@@ -237,11 +288,13 @@ class Triangle(object):
         return self.pointIndex0, self.pointIndex2
 
     def getGeomVertex(self, i):
+        if self._coords is not None:
+            return Point3(*PrimitiveInterface.readData3f(i, self._coords))
         self._rewriter.setRow(i)
         return self._rewriter.getData3f()
 
     def getPointIndices(self):
-        return self.pointIndex0, self.pointIndex1, self.pointIndex2
+        return tuple(self._primitiveInterface.getTriangleVertexIndices(self._selfIndex))
 
     def getPoints(self):
         slf = self.asPointsEnum()
@@ -273,88 +326,58 @@ class Triangle(object):
     def getNumGeomVertices(self):
         return self._primitiveInterface.vdata.getNumRows()
 
-    def getOccupiedEdge(self, point, slf=None):
-        if slf is None:
-            slf = self.asPointsEnum()
-
-        edge0 = slf.point1 - slf.point0
-        edge1 = slf.point2 - slf.point1
-        edge2 = slf.point0 - slf.point2
-
-        testVec0 = point - slf.point0
-        testVec1 = point - slf.point1
-        testVec2 = point - slf.point2
+    def getOccupiedEdge(self, point):
+        x0, y0, x1, y1, x2, y2 = self.getCornerCoords()
+        pX = point.x
+        pY = point.y
         # BLOG coding defensively. (This would actually be optimal if it shortcuts, but it's best to test assumptions.)
         onEdge = ''
-        # z ~= zero only occurs if the point is close this edge and the triangle edge must be longer
-        if abs(edge0.cross(point - slf.point0).z) < EPSILON and edge0.lengthSquared() > testVec0.lengthSquared():
+        # the point is on an edge if it's exactly collinear with it, and the triangle edge must be longer
+        if orient2d(x0, y0, x1, y1, pX, pY) == 0 and\
+                (x1 - x0) ** 2 + (y1 - y0) ** 2 > (pX - x0) ** 2 + (pY - y0) ** 2:
             onEdge += '0'
-        if abs(edge1.cross(point - slf.point1).z) < EPSILON and edge1.lengthSquared() > testVec1.lengthSquared():
+        if orient2d(x1, y1, x2, y2, pX, pY) == 0 and\
+                (x2 - x1) ** 2 + (y2 - y1) ** 2 > (pX - x1) ** 2 + (pY - y1) ** 2:
             onEdge += '1'
-        if abs(edge2.cross(point - slf.point2).z) < EPSILON and edge2.lengthSquared() > testVec2.lengthSquared():
+        if orient2d(x2, y2, x0, y0, pX, pY) == 0 and\
+                (x0 - x2) ** 2 + (y0 - y2) ** 2 > (pX - x2) ** 2 + (pY - y2) ** 2:
             onEdge += '2'
 
         return onEdge
 
     def getSharedFeatures(self, other):
         """
-        returns namedtuple version of {
-        'numSharedPoints': int,'point(N)': T/F, 'edge(N)': T/F,
-        'indicesNotShared': (...), 'otherIndicesNotShared': (...)
-        }
-        or {}
+        returns Triangle.SharedNamedTuple(
+        numSharedPoints: int, point(N): T/F, edge(N): T/F,
+        indicesNotShared: [...], otherIndicesNotShared: [...], other
+        )
         """
         inds = other.getPointIndices()
         selfInds = self.getPointIndices()
+        mask = self.getSharedMask(other, selfInds, inds)
+        return Triangle.SharedNamedTuple(
+            (mask & SHARED_POINT0) + ((mask & SHARED_POINT1) >> 1) + ((mask & SHARED_POINT2) >> 2),
+            mask & SHARED_POINT0 != 0, mask & SHARED_POINT1 != 0, mask & SHARED_POINT2 != 0,
+            mask & SHARED_EDGE0 != 0, mask & SHARED_EDGE1 != 0, mask & SHARED_EDGE2 != 0,
+            [i for i in selfInds if i not in inds],
+            [i for i in inds if i not in selfInds],
+            other,
+        )
 
-        shared = ''
-        d = {
-            'numSharedPoints': 0,
-            'point0': False, 'point1': False, 'point2': False,
-            'edge0': False, 'edge1': False, 'edge2': False,
-            'indicesNotShared': self.getPointIndices(),
-            'otherIndicesNotShared': other.getPointIndices(),
-            'other': other,
-        }
-        if selfInds[0] in inds:
-            d['point0'] = True
-            shared += '0'
-            d['numSharedPoints'] += 1
-            d['indicesNotShared'] = filter(lambda i: i != selfInds[0], d['indicesNotShared'])
-            d['otherIndicesNotShared'] = filter(lambda i: i != selfInds[0], d['otherIndicesNotShared'])
-
-        if selfInds[1] in inds:
-            if shared:
-                d['edge0'] = True
-            d['point1'] = True
-            shared += '1'
-            d['numSharedPoints'] += 1
-            d['indicesNotShared'] = filter(lambda i: i != selfInds[1], d['indicesNotShared'])
-            d['otherIndicesNotShared'] = filter(lambda i: i != selfInds[1], d['otherIndicesNotShared'])
-
-        if selfInds[2] in inds:
-            if shared == '0':
-                d['edge2'] = True
-            elif shared == '1':
-                d['edge1'] = True
-            elif shared == '01':
-                d['edge0'] = True
-                d['edge1'] = True
-                d['edge2'] = True
-            d['point2'] = True
-            d['numSharedPoints'] += 1
-            d['indicesNotShared'] = filter(lambda i: i != selfInds[2], d['indicesNotShared'])
-            d['otherIndicesNotShared'] = filter(lambda i: i != selfInds[2], d['otherIndicesNotShared'])
-        SharedNamedTuple = namedtuple('SharedNamedTuple', [
-            'numSharedPoints',
-            'point0', 'point1', 'point2',
-            'edge0', 'edge1', 'edge2',
-            'indicesNotShared',
-            'otherIndicesNotShared',
-            'other'
-        ])
-        nt = SharedNamedTuple(**d)
-        return nt
+    def getSharedMask(self, other, selfInds=None, otherInds=None):
+        """Returns the SHARED_POINT(N) and SHARED_EDGE(N) bits of this triangle's points and edges that other has."""
+        if selfInds is None:
+            selfInds = self.getPointIndices()
+        if otherInds is None:
+            otherInds = other.getPointIndices()
+        mask = 0
+        if selfInds[0] in otherInds:
+            mask = SHARED_POINT0
+        if selfInds[1] in otherInds:
+            mask |= SHARED_POINT1
+        if selfInds[2] in otherInds:
+            mask |= SHARED_POINT2
+        return mask | _SHARED_EDGES[mask]
 
     def getVec0(self):
         slf = self.asPointsEnum()
@@ -373,10 +396,7 @@ class Triangle(object):
         return self._selfIndex
 
     def isLeftWinding(self):
-        slf = self.asPointsEnum()
-        v1 = slf.point1 - slf.point0
-        v2 = (slf.point2 + slf.point1) / 2 - slf.point0
-        return v1.cross(v2).z > 0
+        return orient2d(*self.getCornerCoords()) > 0
 
     @property
     def point0(self):
@@ -422,6 +442,11 @@ class Triangle(object):
     def setIndex(self, value):
         self._selfIndex = value
 
+    def setPrimitives(self, geomTriangles, index):
+        """Points this triangle at its copy, number index, in another GeomTriangles."""
+        self._primitiveInterface.primitives = geomTriangles
+        self._selfIndex = index
+
     def setPointIndices(self, *args):
         self.pointIndex0 = args[0]
         self.pointIndex1 = args[1]
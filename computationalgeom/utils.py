@@ -2,6 +2,8 @@
 
 from panda3d.core import Point3
 
+from predicates import orient2dPoints
+
 EPSILON = 0.002
 
 
@@ -17,6 +19,59 @@ def getCenterOfPoints3D(points):
     return Point3(x/n, y/n, z/n)
 
 
+def getHilbertIndex(x, y, order):
+    """Returns the distance along a Hilbert curve of the cell (x, y) on a 2**order by 2**order grid."""
+    side = 1 << order
+    d = 0
+    s = side >> 1
+    while s > 0:
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        d += s * s * ((3 * rx) ^ ry)
+        # rotate the quadrant so the curve inside it runs the same way as the curve at the top level
+        if ry == 0:
+            if rx == 1:
+                x = side - 1 - x
+                y = side - 1 - y
+            x, y = y, x
+        s >>= 1
+    return d
+
+
+def getHilbertOrder(xs, ys, order=16):
+    """Returns the indices of the points sorted along a Hilbert curve over their bounding box."""
+    if not xs:
+        return []
+    minX = min(xs)
+    minY = min(ys)
+    size = max(max(xs) - minX, max(ys) - minY)
+    scale = ((1 << order) - 1) / size if size > 0 else 0.0
+    keys = [getHilbertIndex(int((xs[i] - minX) * scale), int((ys[i] - minY) * scale), order)
+            for i in range(0, len(xs))]
+    return sorted(range(0, len(xs)), key=keys.__getitem__)
+
+
+def getBrioOrder(xs, ys, seed=0):
+    """Returns the indices of the points in a biased randomized insertion order. Each point is put in a random round,
+    the last round holding about half the points, the one before it a quarter, and so on. Rounds go from smallest
+    to largest, and the points of each round are sorted along a Hilbert curve."""
+    import random
+    rand = random.Random(seed)
+    rounds = [[]]
+    for i in range(0, len(xs)):
+        r = 0
+        while r < 32 and rand.random() < 0.5:
+            r += 1
+        while len(rounds) <= r:
+            rounds.append([])
+        rounds[r].append(i)
+    order = []
+    for rnd in reversed(rounds):
+        roundOrder = getHilbertOrder([xs[i] for i in rnd], [ys[i] for i in rnd])
+        order.extend(rnd[i] for i in roundOrder)
+    return order
+
+
 def getIntersectionBetweenPoints(pt0, pt1, pt2, pt3):
 
     denominator = (pt3.y - pt2.y)*(pt1.x - pt0.x) - (pt3.x - pt2.x)*(pt1.y - pt0.y)
@@ -28,11 +83,9 @@ def getIntersectionBetweenPoints(pt0, pt1, pt2, pt3):
 
 def getLeftPt(pt, ptPair):
     """Takes the center of two points then returns the left point as viewed from a third point (1st parameter)."""
-    midPt = getCenterOfPoints3D(ptPair)
-    vecToMid = midPt - pt
-    vecToPt1 = ptPair[0] - pt
-    # the point on the leftVec has a negative z in its cross product with the middle point
-    if vecToPt1.cross(vecToMid).z < 0:
+    # orient2d < 0 means pt, ptPair[0], ptPair[1] turn clockwise, so seen from pt ptPair[1] is right of ptPair[0],
+    # which makes ptPair[0] the left point
+    if orient2dPoints(pt, ptPair[0], ptPair[1]) < 0:
         return ptPair[0]
     else:
         return ptPair[1]
@@ -41,20 +94,22 @@ def getLeftPt(pt, ptPair):
 def isPointInWedge(pt, line1, line2, inclusive=True):
     """Returns True, if the given point is inside the infinite wedge formed
     by the two lines (inclusive = True considers points on the lines to be in the wedge.)"""
-    lftVec, rtVec = makeWedge(line1, line2)
-    for i in range(0, 2):
-        if line1[i] in line2:
-            shared1 = i
-    ptVec = pt - line1[shared1]
-    # right cross pt should be up. Left cross pt should be down, if the point is inside the infinite wedge.
+    lftPt, rtPt, sharedPt = _makeWedgePoints(line1, line2)
+    # pt should turn counterclockwise from the right edge and clockwise from the left, if it's inside the wedge.
     if inclusive:  # points on the edge of the wedge count as in the wedge
-        return rtVec.cross(ptVec).z >= 0 >= lftVec.cross(ptVec).z
+        return orient2dPoints(sharedPt, rtPt, pt) >= 0 >= orient2dPoints(sharedPt, lftPt, pt)
     else:
-        return rtVec.cross(ptVec).z > 0 > lftVec.cross(ptVec).z
+        return orient2dPoints(sharedPt, rtPt, pt) > 0 > orient2dPoints(sharedPt, lftPt, pt)
 
 
 def makeWedge(line1, line2):
     """Makes a wedge formed by two supplied edges, and returns that wedge in the form [leftVector, rightVector]"""
+    lftPt, rtPt, sharedPt = _makeWedgePoints(line1, line2)
+    return [lftPt - sharedPt, rtPt - sharedPt]
+
+
+def _makeWedgePoints(line1, line2):
+    """Returns the left end, right end and shared point of the wedge formed by two supplied edges."""
     # this expects a point and two lines.
     # The lines are presented as two points each, and one of those must be in both lines.
     shared1 = shared2 = notShared1 = notShared2 = -1
@@ -80,7 +135,4 @@ def makeWedge(line1, line2):
         rtPt = line2[notShared2]
     else:
         rtPt = line1[notShared1]
-
-    rtVec = rtPt - line1[shared1]
-    lftVec = lftPt - line1[shared1]
-    return [lftVec, rtVec]
+    return lftPt, rtPt, line1[shared1]
@@ -0,0 +1,47 @@
+__author__ = 'Lab Hatter'
+"""Times AdjacencyList construction on grid meshes from 1k to 100k triangles.
+The time per triangle should stay flat, if neighbour linking is linear."""
+
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from panda3d.core import Point3
+from PolygonUtils.AdjacencyList import AdjacencyList
+from PolygonUtils.Triangle import Triangle
+
+
+def makeGridTriangles(numTriangles):
+    """Cuts each cell of a square grid in half until there are at least numTriangles triangles."""
+    cells = int(math.ceil(math.sqrt(numTriangles / 2.0)))
+    triangles = []
+    for row in range(0, cells):
+        for col in range(0, cells):
+            bl = Point3(col, row, 0)
+            br = Point3(col + 1, row, 0)
+            tr = Point3(col + 1, row + 1, 0)
+            tl = Point3(col, row + 1, 0)
+            triangles.append(Triangle(bl, br, tr))
+            triangles.append(Triangle(bl, tr, tl))
+    return triangles
+
+
+def timeAdjacencyList(triangles, repeats=3):
+    """Returns the best of several AdjacencyList builds, in seconds."""
+    best = float('inf')
+    for r in range(0, repeats):
+        st = time.time()
+        AdjacencyList(triangles)
+        best = min(best, time.time() - st)
+    return best
+
+
+if __name__ == '__main__':
+    print("triangles      seconds   usec/triangle")
+    for size in (1000, 10000, 100000):
+        tris = makeGridTriangles(size)
+        secs = timeAdjacencyList(tris)
+        print("{0:>9} {1:>12.4f} {2:>15.2f}".format(len(tris), secs, secs / len(tris) * 1.0e6))
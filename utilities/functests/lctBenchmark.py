@@ -0,0 +1,84 @@
+__author__ = 'Lab Hatter'
+"""Compares the width tables of a constrained Delaunay triangulation and of a Local Clearance Triangulation made
+from it, on squares of pillars from 4 to 36 holes. The CDT's widths come from makeWidthTable, which searches past
+each triangle for obstacles. The LCT refines the mesh once so that every width is local to its triangle.
+Both are then queried with the same radius A* searches."""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from panda3d.core import Point3
+from computationalgeom.constrainedDelaunayTriangulator import ConstrainedDelaunayTriangulator
+from computationalgeom.adjacencyListLCT import LocalClearanceAdjacencyList
+from PolygonUtils.AdjacencyList import AdjacencyList
+from TriangulationAStarR import TriangulationAStarR
+
+
+def makePillarTriangulator(pillarsPerSide, seed=0):
+    """Triangulates a square room with a grid of jittered square pillars in it as holes."""
+    rand = random.Random(seed)
+    size = 10.0 * (pillarsPerSide + 1)
+    triangulator = ConstrainedDelaunayTriangulator()
+    for x, y in ((0, 0), (size, 0), (size, size), (0, size)):
+        triangulator.addVertexToPolygon(x, y, 0)
+    for row in range(1, pillarsPerSide + 1):
+        for col in range(1, pillarsPerSide + 1):
+            cx = 10.0 * col + rand.uniform(-2, 2)
+            cy = 10.0 * row + rand.uniform(-2, 2)
+            half = rand.uniform(1, 3)
+            triangulator.beginHole()
+            for dX, dY in ((-half, -half), (half, -half), (half, half), (-half, half)):
+                triangulator.addVertexToHole(cx + dX, cy + dY, 0)
+    triangulator.triangulate(constrain=True)
+    return triangulator, size
+
+
+def getQueries(size, numQueries, seed=0):
+    """Returns pairs of random start and goal points in the room's free space, near its walls."""
+    rand = random.Random(seed)
+    queries = []
+    for q in range(0, numQueries):
+        start = Point3(rand.uniform(0.1, 4), rand.uniform(0.1, size - 0.1), 0)
+        goal = Point3(size - rand.uniform(0.1, 4), rand.uniform(0.1, size - 0.1), 0)
+        queries.append((start, goal))
+    return queries
+
+
+def timeQueries(aLst, widths, queries, radius):
+    """Returns the seconds all the queries took, and how many found a path."""
+    locator = aLst.getPointLocator()
+    found = 0
+    st = time.time()
+    for start, goal in queries:
+        if TriangulationAStarR(aLst.adjLst, start, goal, radius=radius, locator=locator, widths=widths).AStar():
+            found += 1
+    return time.time() - st, found
+
+
+if __name__ == '__main__':
+    radius = 0.5
+    queries = 20
+    print("holes    mesh  triangles   build secs   query secs   paths")
+    for pillarsPerSide in (2, 4, 6):
+        triangulator, size = makePillarTriangulator(pillarsPerSide)
+        tests = getQueries(size, queries)
+
+        st = time.time()
+        aLst = AdjacencyList(triangulator.getCornerTable())
+        widths = aLst.getWidthTable()
+        buildSecs = time.time() - st
+        querySecs, found = timeQueries(aLst, widths, tests, radius)
+        print("{0:>5} {1:>7} {2:>10} {3:>12.4f} {4:>12.4f} {5:>4}/{6}".format(
+            pillarsPerSide ** 2, 'CDT', len(aLst.adjLst), buildSecs, querySecs, found, queries))
+
+        st = time.time()
+        aLst = LocalClearanceAdjacencyList(triangulator).getAdjacencyList()
+        widths = aLst.getWidthTable()
+        buildSecs = time.time() - st
+        querySecs, found = timeQueries(aLst, widths, tests, radius)
+        print("{0:>5} {1:>7} {2:>10} {3:>12.4f} {4:>12.4f} {5:>4}/{6}".format(
+            pillarsPerSide ** 2, 'LCT', len(aLst.adjLst), buildSecs, querySecs, found, queries))
@@ -0,0 +1,59 @@
+__author__ = 'Lab Hatter'
+"""Times legalization with each ConstrainedDelaunayAdjacencyTriangle.legalityMode on random points.
+'angles' is the minimum angle comparison isLegal used to make, and 'incircle' the determinant test that replaced it.
+Both the whole triangulation and isLegal alone, over every pair of neighbouring triangles, are timed."""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from computationalgeom.constrainedDelaunayTriangulator import ConstrainedDelaunayTriangulator
+from computationalgeom.constrainedDelaunayTriangle import ConstrainedDelaunayAdjacencyTriangle
+
+
+def makeTriangulator(numPoints, seed=0):
+    """Returns a triangulator with numPoints random points, not yet triangulated."""
+    rand = random.Random(seed)
+    triangulator = ConstrainedDelaunayTriangulator()
+    for i in range(0, numPoints):
+        triangulator.addVertexToPolygon(rand.uniform(0, 100), rand.uniform(0, 100), 0)
+    return triangulator
+
+
+def timeTriangulate(numPoints, mode):
+    """Returns the seconds to triangulate numPoints random points, and the triangles."""
+    ConstrainedDelaunayAdjacencyTriangle.legalityMode = mode
+    triangulator = makeTriangulator(numPoints)
+    st = time.time()
+    triangulator.triangulate(constrain=False)
+    return time.time() - st, triangulator.getTriangleList()
+
+
+def timeIsLegal(triangles, mode, repeats=3):
+    """Returns the number of isLegal tests per second over every pair of neighbouring triangles."""
+    ConstrainedDelaunayAdjacencyTriangle.legalityMode = mode
+    pairs = []
+    for tri in triangles:
+        for nayb in tri.getNeighbors(includeEmpties=False):
+            other = triangles[nayb]
+            pairs.append((tri, other, tri.getSharedFeatures(other)))
+    best = float('inf')
+    for r in range(0, repeats):
+        st = time.time()
+        for tri, other, sharedFeatures in pairs:
+            tri.isLegal(other, sharedFeatures)
+        best = min(best, time.time() - st)
+    return len(pairs) / best
+
+
+if __name__ == '__main__':
+    print("points       mode   triangulate secs   isLegal/sec")
+    for numPoints in (100, 200, 400):
+        for mode in ('angles', 'incircle'):
+            secs, triangles = timeTriangulate(numPoints, mode)
+            rate = timeIsLegal(triangles, mode)
+            print("{0:>6} {1:>10} {2:>18.4f} {3:>13.0f}".format(numPoints, mode, secs, rate))
+    ConstrainedDelaunayAdjacencyTriangle.legalityMode = 'incircle'
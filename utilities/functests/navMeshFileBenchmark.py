@@ -0,0 +1,42 @@
+__author__ = 'Lab Hatter'
+"""Compares building an AdjacencyList, with its width table and point locator, against loading it from a navmesh
+file (see PolygonUtils.NavMeshFile) on grid meshes from 250 to 4k triangles. Loading only maps the file, so it
+should take about the same time at every size."""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from PolygonUtils.AdjacencyList import AdjacencyList
+from PolygonUtils.NavMeshFile import saveNavMesh, loadNavMesh
+from adjacencyListBenchmark import makeGridTriangles
+
+
+def buildNavMesh(triangles):
+    aLst = AdjacencyList(triangles)
+    aLst.getWidthTable()
+    aLst.getPointLocator()
+    return aLst
+
+
+if __name__ == '__main__':
+    path = os.path.join(tempfile.mkdtemp(), 'bench.nav')
+    print("triangles   build seconds    load seconds    file KB")
+    for size in (250, 1000, 4000):
+        tris = makeGridTriangles(size)
+        st = time.time()
+        aLst = buildNavMesh(tris)
+        buildSecs = time.time() - st
+        saveNavMesh(aLst, path)
+        st = time.time()
+        loaded = loadNavMesh(path)
+        loadSecs = time.time() - st
+        assert list(loaded.getWidthTable()) == list(aLst.getWidthTable())
+        print("{0:>9} {1:>15.4f} {2:>15.4f} {3:>10}".format(len(tris), buildSecs, loadSecs,
+                                                         os.path.getsize(path) // 1024))
+        del loaded
+    os.remove(path)
+    os.rmdir(os.path.dirname(path))
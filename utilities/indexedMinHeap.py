@@ -0,0 +1,102 @@
+#!/usr/bin/python
+from array import array
+
+
+class IndexedMinHeap(object):
+    """A binary min-heap of the integers 0..size-1 that knows where each item sits, so an item's key can be
+    lowered in place rather than pushing a duplicate. Equal keys pop in the order they were pushed."""
+
+    def __init__(self, size):
+        self._heap = []  # [key, insertion count, item]
+        self._positions = array('i', [-1]) * size
+        self._counter = 0
+
+    def __contains__(self, item):
+        return self._positions[item] != -1
+
+    def __iter__(self):
+        return (entry[2] for entry in self._heap)
+
+    def __len__(self):
+        return len(self._heap)
+
+    def getKey(self, item):
+        return self._heap[self._positions[item]][0]
+
+    def peek(self):
+        """Returns the (key, item) with the lowest key without removing it."""
+        return self._heap[0][0], self._heap[0][2]
+
+    def pop(self):
+        """Removes and returns the (key, item) with the lowest key."""
+        top = self._heap[0]
+        last = self._heap.pop()
+        self._positions[top[2]] = -1
+        if self._heap:
+            self._heap[0] = last
+            self._positions[last[2]] = 0
+            self._siftDown(0)
+        return top[0], top[2]
+
+    def push(self, item, key):
+        """Adds the item, or lowers its key if it's already in the heap with a higher one.
+        Returns True if the heap changed."""
+        pos = self._positions[item]
+        if pos != -1:
+            return self.decreaseKey(item, key)
+        self._heap.append([key, self._counter, item])
+        self._counter += 1
+        self._positions[item] = len(self._heap) - 1
+        self._siftUp(len(self._heap) - 1)
+        return True
+
+    def decreaseKey(self, item, key):
+        """Lowers the key of an item in the heap. Returns False if the key isn't lower than the current one."""
+        pos = self._positions[item]
+        entry = self._heap[pos]
+        if key >= entry[0]:
+            return False
+        entry[0] = key
+        self._siftUp(pos)
+        return True
+
+    def _siftUp(self, pos):
+        heap = self._heap
+        positions = self._positions
+        entry = heap[pos]
+        while pos > 0:
+            parentPos = (pos - 1) >> 1
+            parent = heap[parentPos]
+            if entry[0] < parent[0] or entry[0] == parent[0] and entry[1] < parent[1]:
+                heap[pos] = parent
+                positions[parent[2]] = pos
+                pos = parentPos
+            else:
+                break
+        heap[pos] = entry
+        positions[entry[2]] = pos
+
+    def _siftDown(self, pos):
+        heap = self._heap
+        positions = self._positions
+        size = len(heap)
+        entry = heap[pos]
+        while True:
+            childPos = 2 * pos + 1
+            if childPos >= size:
+                break
+            rightPos = childPos + 1
+            if rightPos < size:
+                child = heap[childPos]
+                right = heap[rightPos]
+                if right[0] < child[0] or right[0] == child[0] and right[1] < child[1]:
+                    childPos = rightPos
+            child = heap[childPos]
+            if child[0] < entry[0] or child[0] == entry[0] and child[1] < entry[1]:
+                heap[pos] = child
+                positions[child[2]] = pos
+                pos = childPos
+            else:
+                break
+        heap[pos] = entry
+        positions[entry[2]] = pos